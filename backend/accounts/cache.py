@@ -0,0 +1,88 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+# ================== CACHE CON TTL ==================
+class CacheTTL:
+    """Diccionario acotado (descarta el menos usado) cuyas entradas vencen a los `ttl` segundos"""
+
+    def __init__(self, maximo, ttl):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, vence = entrada
+            if vence <= time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def quitar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def vaciar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+# ================== USUARIOS AUTENTICADOS ==================
+# Filas (id, nombre, email, rol, activo) por id, y payloads de JWT ya verificados por digest
+_usuarios = CacheTTL(getattr(settings, "AUTH_CACHE_MAXIMO", 1000), getattr(settings, "AUTH_CACHE_TTL_SEGUNDOS", 30))
+_tokens = CacheTTL(getattr(settings, "AUTH_CACHE_MAXIMO", 1000), getattr(settings, "AUTH_CACHE_TTL_SEGUNDOS", 30))
+
+
+def digest_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def obtener_payload(token):
+    return _tokens.obtener(digest_token(token))
+
+
+def guardar_payload(token, payload):
+    """Memoriza el payload sin pasar del `exp` del token"""
+    restante = payload.get("exp", 0) - time.time() if "exp" in payload else None
+    if restante is not None and restante <= 0:
+        return
+    _tokens.guardar(digest_token(token), payload, ttl=restante)
+
+
+def obtener_usuario(user_id):
+    return _usuarios.obtener(user_id)
+
+
+def guardar_usuario(user_id, fila):
+    _usuarios.guardar(user_id, fila)
+
+
+def invalidar_usuario(user_id):
+    """Llamar al desactivar o modificar un usuario: la próxima petición relee su fila"""
+    _usuarios.quitar(user_id)
+
+
+def vaciar_cache_autenticacion():
+    _usuarios.vaciar()
+    _tokens.vaciar()
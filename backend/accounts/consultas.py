@@ -0,0 +1,133 @@
+import base64
+import json
+
+from dataImport.consultas import ParametroInvalido, normalizar_busqueda
+
+
+# ================== LISTADO DE USUARIOS ==================
+# Pensado para los selectores de usuario: pocas filas por pedido, ordenadas por nombre
+LIMITE_USUARIOS_POR_DEFECTO = 25
+LIMITE_USUARIOS_MAXIMO = 100
+
+VALORES_ACTIVO = {"true": True, "1": True, "false": False, "0": False}
+
+
+def parsear_filtros_usuarios(params):
+    """Filtros opcionales: escuela (id), rol y activo (true/false)"""
+    filtros = {}
+    if params.get("escuela"):
+        try:
+            filtros["escuela"] = int(params["escuela"])
+        except ValueError:
+            raise ParametroInvalido("'escuela' debe ser un número entero")
+    if params.get("rol"):
+        filtros["rol"] = params["rol"].strip()
+    if params.get("activo"):
+        activo = params["activo"].strip().lower()
+        if activo not in VALORES_ACTIVO:
+            raise ParametroInvalido("'activo' debe ser true o false")
+        filtros["activo"] = VALORES_ACTIVO[activo]
+    return filtros
+
+
+def parsear_limite_usuarios(texto):
+    if not texto:
+        return LIMITE_USUARIOS_POR_DEFECTO
+    try:
+        limite = int(texto)
+    except ValueError:
+        raise ParametroInvalido("'limite' debe ser un número entero")
+    if limite < 1:
+        raise ParametroInvalido("'limite' debe ser mayor que cero")
+    return min(limite, LIMITE_USUARIOS_MAXIMO)
+
+
+def codificar_cursor_usuarios(nombre, usuario_id):
+    """Cursor opaco con la posición (nombre, id) del último usuario entregado"""
+    return base64.urlsafe_b64encode(json.dumps([nombre, usuario_id]).encode()).decode()
+
+
+def decodificar_cursor_usuarios(texto):
+    if not texto:
+        return None
+    try:
+        nombre, usuario_id = json.loads(base64.urlsafe_b64decode(texto.encode()))
+        if not isinstance(nombre, str):
+            raise TypeError
+        return nombre, int(usuario_id)
+    except (ValueError, TypeError):
+        raise ParametroInvalido("Cursor inválido")
+
+
+def _patron_palabra(termino):
+    """LIKE de una palabra que empieza con `termino`; nombre_busqueda empieza con espacio"""
+    escapado = termino.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"% {escapado}%"
+
+
+def construir_consulta_usuarios(filtros, texto=None, posicion=None, limite=LIMITE_USUARIOS_POR_DEFECTO):
+    """
+    SELECT de usuarios ordenado por (nombre, id), con su escuela.
+
+    `texto` (ya normalizado) filtra por prefijo de palabra sin tildes: cada término tiene que
+    ser el comienzo de alguna palabra del nombre ("pern jua" encuentra a Juan Pernalete).
+    Esa condición usa idx_usuarios_nombre_busqueda (trigramas) y el orden sin búsqueda
+    recorre idx_usuarios_nombre. Pide limite + 1 filas para saber si hay otra página.
+    """
+    condiciones = []
+    params = []
+    for termino in (texto or "").split():
+        condiciones.append("u.nombre_busqueda LIKE %s")
+        params.append(_patron_palabra(termino))
+    if "escuela" in filtros:
+        condiciones.append("u.escuela_id = %s")
+        params.append(filtros["escuela"])
+    if "rol" in filtros:
+        condiciones.append("u.rol::text = %s")
+        params.append(filtros["rol"])
+    if "activo" in filtros:
+        condiciones.append("u.activo = %s")
+        params.append(filtros["activo"])
+    if posicion:
+        condiciones.append("(u.nombre, u.id) > (%s, %s)")
+        params.extend(posicion)
+
+    sql = f"""
+        SELECT u.id, u.codigo, u.nombre, u.email, u.rol, u.activo, e.nombre, e.id
+        FROM usuarios u
+        LEFT JOIN escuelas e ON u.escuela_id = e.id
+        {"WHERE " + " AND ".join(condiciones) if condiciones else ""}
+        ORDER BY u.nombre, u.id
+        LIMIT %s
+    """
+    params.append(limite + 1)
+    return sql, params
+
+
+def pagina_usuarios(cursor, filtros, texto=None, posicion=None, limite=LIMITE_USUARIOS_POR_DEFECTO):
+    """(usuarios, siguiente_cursor) a partir de `posicion`; siguiente_cursor es None en la última página"""
+    sql, params = construir_consulta_usuarios(filtros, normalizar_busqueda(texto), posicion, limite)
+    cursor.execute(sql, params)
+    filas = cursor.fetchall()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor_usuarios(filas[-1][2], filas[-1][0])
+
+    usuarios = [
+        {
+            'id': fila[0],
+            'codigo': fila[1],
+            'nombre': fila[2],
+            'email': fila[3],
+            'rol': fila[4],
+            'activo': fila[5],
+            'escuela': {
+                'id': fila[7],
+                'nombre': fila[6]
+            } if fila[6] else None
+        }
+        for fila in filas
+    ]
+    return usuarios, siguiente
@@ -1,3 +1,126 @@
-from django.test import TestCase
+import datetime
+import json
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from . import cache, consultas, views
+
+
+class CacheTTLTests(SimpleTestCase):
+    def test_vence_y_descarta_el_menos_usado(self):
+        datos = cache.CacheTTL(maximo=2, ttl=60)
+        datos.guardar(1, "a")
+        datos.guardar(2, "b")
+        datos.obtener(1)
+        datos.guardar(3, "c")
+        self.assertIsNone(datos.obtener(2))
+        self.assertEqual(datos.obtener(1), "a")
+
+        with mock.patch.object(cache.time, "monotonic", return_value=cache.time.monotonic() + 61):
+            self.assertIsNone(datos.obtener(1))
+
+
+class LoginRequiredCacheTests(SimpleTestCase):
+    FILA = (7, "Ana Diaz", "ana@uni.edu", "profesor", True)
+
+    def setUp(self):
+        cache.vaciar_cache_autenticacion()
+        self.addCleanup(cache.vaciar_cache_autenticacion)
+        self.cursor = mock.MagicMock()
+        self.cursor.__enter__.return_value = self.cursor
+        self.cursor.fetchone.return_value = self.FILA
+        parche = mock.patch.object(views, "connection", mock.Mock(cursor=mock.Mock(return_value=self.cursor)))
+        parche.start()
+        self.addCleanup(parche.stop)
+
+        self.vista = views.login_required_api(lambda request: HttpResponse(request.user_data[1]))
+        token = views.generate_jwt_token(7, self.FILA)
+        self.peticion = lambda: RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_una_consulta_para_varias_peticiones(self):
+        with mock.patch.object(views, "verify_jwt_token", wraps=views.verify_jwt_token) as verificar:
+            for _ in range(3):
+                self.assertEqual(self.vista(self.peticion()).content, b"Ana Diaz")
+        self.assertEqual(self.cursor.execute.call_count, 1)
+        self.assertEqual(verificar.call_count, 1)
+
+    def test_invalidar_relee_el_usuario(self):
+        self.vista(self.peticion())
+        cache.invalidar_usuario(7)
+        self.cursor.fetchone.return_value = None  # desactivado
+
+        respuesta = self.vista(self.peticion())
+        self.assertEqual(respuesta.status_code, 401)
+
+    def test_no_memoriza_tokens_vencidos(self):
+        vencido = jwt.encode(
+            {"user_id": 7, "exp": datetime.datetime.utcnow() - datetime.timedelta(minutes=1)},
+            settings.SECRET_KEY, algorithm="HS256",
+        )
+        respuesta = self.vista(RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {vencido}"))
+        self.assertEqual(respuesta.status_code, 401)
+        self.assertEqual(len(cache._tokens), 0)
+
+
+class ListadoUsuariosTests(SimpleTestCase):
+    FILAS = [
+        (3, 1001, "Ana Díaz", "ana@uni.edu", "usuario", True, "Escuela 1", 1),
+        (9, 1002, "Ángel Pérez", "angel@uni.edu", "gestor", True, None, None),
+        (4, 1003, "Beatriz Ortega", "bea@uni.edu", "usuario", False, "Escuela 1", 1),
+    ]
+
+    def setUp(self):
+        self.cursor = mock.MagicMock()
+        self.cursor.__enter__.return_value = self.cursor
+        self.cursor.fetchall.return_value = self.FILAS
+        parche = mock.patch.object(views, "connection", mock.Mock(cursor=mock.Mock(return_value=self.cursor)))
+        parche.start()
+        self.addCleanup(parche.stop)
+        parche = mock.patch.object(views, "obtener_usuario", return_value=(7, "Admin", "a@uni.edu", "admin", True))
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.token = views.generate_jwt_token(7, (7, "Admin", "a@uni.edu", "admin", True))
+
+    def _pedir(self, **params):
+        peticion = RequestFactory().get("/users/", params, HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        respuesta = views.users_list_view(peticion)
+        return respuesta.status_code, json.loads(respuesta.content)
+
+    def test_pagina_por_nombre_e_id(self):
+        status, datos = self._pedir(limite="2")
+        self.assertEqual(status, 200)
+        self.assertEqual([u["id"] for u in datos["users"]], [3, 9])
+        self.assertIsNone(datos["users"][1]["escuela"])
+        self.assertEqual(consultas.decodificar_cursor_usuarios(datos["siguiente_cursor"]), ("Ángel Pérez", 9))
+
+        sql, params = self.cursor.execute.call_args[0]
+        self.assertIn("ORDER BY u.nombre, u.id", sql)
+        self.assertEqual(params, [3])
+
+        self.cursor.fetchall.return_value = self.FILAS[2:]
+        status, datos = self._pedir(limite="2", cursor=datos["siguiente_cursor"])
+        self.assertIsNone(datos["siguiente_cursor"])
+        sql, params = self.cursor.execute.call_args[0]
+        self.assertIn("(u.nombre, u.id) > (%s, %s)", sql)
+        self.assertEqual(params, ["Ángel Pérez", 9, 3])
+
+    def test_busqueda_sin_tildes_y_filtros(self):
+        self._pedir(q="  ÁNGEL  pé_", escuela="1", rol="gestor", activo="false")
+        sql, params = self.cursor.execute.call_args[0]
+        self.assertEqual(sql.count("u.nombre_busqueda LIKE %s"), 2)
+        self.assertEqual(params, ["% angel%", "% pe\\_%", 1, "gestor", False, consultas.LIMITE_USUARIOS_POR_DEFECTO + 1])
+
+    def test_limite_maximo(self):
+        self._pedir(limite="5000")
+        self.assertEqual(self.cursor.execute.call_args[0][1], [consultas.LIMITE_USUARIOS_MAXIMO + 1])
+
+    def test_parametros_invalidos(self):
+        for params in [{"escuela": "x"}, {"activo": "quizas"}, {"limite": "0"}, {"cursor": "no-es-un-cursor"}]:
+            status, datos = self._pedir(**params)
+            self.assertEqual(status, 400, params)
+            self.assertIn("error", datos)
+        self.cursor.execute.assert_not_called()
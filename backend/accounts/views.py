@@ -9,6 +9,12 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.db import connection
 from django.conf import settings
+from dataImport.consultas import ParametroInvalido
+from dataImport.usuarios import registrar_usuario_en_cache
+from .cache import guardar_payload, guardar_usuario, obtener_payload, obtener_usuario
+from .consultas import (
+    decodificar_cursor_usuarios, pagina_usuarios, parsear_filtros_usuarios, parsear_limite_usuarios,
+)
 
 # =============================
 # Funciones auxiliares
@@ -45,7 +51,13 @@ def verify_jwt_token(token):
         return None
 
 def login_required_api(view_func):
-    """Decorador para endpoints que requieren token JWT válido"""
+    """
+    Decorador para endpoints que requieren token JWT válido.
+
+    Deja en request.user_id y request.user_data (id, nombre, email, rol, activo). El token
+    verificado y la fila del usuario se cachean unos segundos (AUTH_CACHE_TTL_SEGUNDOS) para no
+    consultar la base en cada petición; ver accounts.cache.invalidar_usuario.
+    """
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         # Obtener el token del header Authorization
@@ -54,27 +66,34 @@ def login_required_api(view_func):
             return JsonResponse({'error': 'Token de autorización requerido'}, status=401)
         
         token = auth_header.split(' ')[1]
-        payload = verify_jwt_token(token)
+        payload = obtener_payload(token)
+        if payload is None:
+            payload = verify_jwt_token(token)
+            if payload:
+                guardar_payload(token, payload)
         
         if not payload:
             return JsonResponse({'error': 'Token inválido o expirado'}, status=401)
         
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT id, nombre, email, rol, activo 
-                    FROM usuarios 
-                    WHERE id = %s AND activo = true
-                """, (payload['user_id'],))
-                user = cursor.fetchone()
+        user = obtener_usuario(payload['user_id'])
+        if user is None:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("""
+                        SELECT id, nombre, email, rol, activo 
+                        FROM usuarios 
+                        WHERE id = %s AND activo = true
+                    """, (payload['user_id'],))
+                    user = cursor.fetchone()
+            except Exception as e:
+                return JsonResponse({'error': 'Error de base de datos', 'message': str(e)}, status=500)
 
             if not user:
                 return JsonResponse({'error': 'Usuario no encontrado o inactivo'}, status=401)
+            guardar_usuario(payload['user_id'], user)
 
-            request.user_data = user
-            request.user_id = payload['user_id']
-        except Exception as e:
-            return JsonResponse({'error': 'Error de base de datos', 'message': str(e)}, status=500)
+        request.user_data = user
+        request.user_id = payload['user_id']
 
         return view_func(request, *args, **kwargs)
     return wrapper
@@ -178,37 +197,29 @@ def profile_view(request):
 @login_required_api
 @require_http_methods(["GET"])
 def users_list_view(request):
-    """Listar todos los usuarios del sistema"""
+    """
+    Usuarios del sistema por nombre, paginados por cursor.
+
+    Query params opcionales: q (prefijo de palabras del nombre, sin importar tildes), escuela,
+    rol, activo (true/false), limite (hasta 100) y cursor (el siguiente_cursor de la página
+    anterior).
+    """
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT u.id, u.codigo, u.nombre, u.email, u.rol, u.activo,
-                       e.nombre, e.id
-                FROM usuarios u
-                LEFT JOIN escuelas e ON u.escuela_id = e.id
-                ORDER BY u.nombre ASC
-            """)
-            users = cursor.fetchall()
+        filtros = parsear_filtros_usuarios(request.GET)
+        limite = parsear_limite_usuarios(request.GET.get('limite'))
+        posicion = decodificar_cursor_usuarios(request.GET.get('cursor'))
+    except ParametroInvalido as e:
+        return JsonResponse({'error': str(e)}, status=400)
 
-        users_list = []
-        for user in users:
-            users_list.append({
-                'id': user[0],
-                'codigo': user[1],
-                'nombre': user[2],
-                'email': user[3],
-                'rol': user[4],
-                'activo': user[5],
-                'escuela': {
-                    'id': user[7],
-                    'nombre': user[6]
-                } if user[6] else None
-            })
+    try:
+        with connection.cursor() as cursor:
+            users_list, siguiente = pagina_usuarios(cursor, filtros, request.GET.get('q'), posicion, limite)
 
         return JsonResponse({
             'success': True,
             'users': users_list,
-            'total': len(users_list)
+            'total': len(users_list),
+            'siguiente_cursor': siguiente
         })
 
     except Exception as e:
@@ -275,6 +286,9 @@ def register_view(request):
             if not new_user:
                 return JsonResponse({'error': 'Error al crear usuario'}, status=500)
 
+        # El cache de nombres usado por las importaciones lo incorpora sin releer la tabla
+        registrar_usuario_en_cache(new_user[0], new_user[2])
+
         return JsonResponse({
             'success': True,
             'user': {
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -25,7 +26,7 @@ SECRET_KEY = 'django-insecure-4(5^gem2qmz%5n%ucjq1nw%c2z=7_=hdi34ygj9t6kus@xo$hu
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [h for h in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if h]
 
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -70,11 +71,16 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'postgres',
-        'USER': 'postgres.rsmxmirttcvvxmexunpl',
-        'PASSWORD': 'z1QlZIHiYHrrVcve',
-        'HOST': 'aws-1-us-east-2.pooler.supabase.com',
-        'PORT': '6543',
+        'NAME': os.environ.get('DB_NAME', 'postgres'),
+        'USER': os.environ.get('DB_USER', 'postgres.rsmxmirttcvvxmexunpl'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'z1QlZIHiYHrrVcve'),
+        'HOST': os.environ.get('DB_HOST', 'aws-1-us-east-2.pooler.supabase.com'),
+        'PORT': os.environ.get('DB_PORT', '6543'),
+        # Reutiliza la conexión al pooler entre peticiones; se verifica antes de usarla.
+        # Con el pooler en modo transacción no se deja estado de sesión: las tablas temporales
+        # son ON COMMIT DROP y los cursores del servidor viven dentro de transaction.atomic.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -101,6 +107,57 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'  # Deshabilitar auto campos de Django
 
+# Importaciones asíncronas (dataImport.tareas): hilos del pool y trabajos en espera
+IMPORTACION_WORKERS = 2
+IMPORTACION_MAX_PENDIENTES = 20
+# Días que se guarda en importacion_trabajos un trabajo terminado
+IMPORTACION_TRABAJOS_RETENCION_DIAS = 7
+
+# Importación de varios archivos (dataImport.masiva): procesos que leen y limpian en paralelo
+# (menos de 2 = en el mismo proceso), archivos por petición y tamaño máximo de un ZIP descomprimido
+IMPORTACION_PROCESOS = int(os.environ.get("IMPORTACION_PROCESOS", min(4, os.cpu_count() or 1)))
+IMPORTACION_MAX_ARCHIVOS = 100
+IMPORTACION_MAX_BYTES_ZIP = 200 * 1024 * 1024
+
+# Archivos ya importados (dataImport.huellas): cuántos resultados se recuerdan en memoria y por
+# cuánto tiempo; pasado eso se buscan en importacion_archivos
+IMPORTACION_HUELLAS_MAXIMO = 500
+IMPORTACION_HUELLAS_TTL_SEGUNDOS = 3600
+
+# Similitud mínima (0-100, token_sort_ratio) para aceptar una ubicación escrita distinto (dataImport.ubicaciones)
+UBICACIONES_UMBRAL_FUZZY = 88
+
+# Filas por lote al importar: acota la memoria y es la unidad de savepoint (dataImport.importacion)
+IMPORTACION_TAMANO_LOTE = 5000
+
+# Desde cuántas filas el UPSERT de inventario usa COPY + tabla temporal (dataImport.carga)
+CARGA_COPY_MIN_FILAS = 5000
+
+# login_required_api: segundos y cantidad de usuarios/tokens que se recuerdan (accounts.cache)
+AUTH_CACHE_TTL_SEGUNDOS = 30
+AUTH_CACHE_MAXIMO = 1000
+
+# Métricas de importación (dataImport.metricas): una línea por importación con tiempos por
+# etapa y aciertos por nivel. IMPORTACION_LOG_NIVEL=WARNING las apaga; el detalle por nombre
+# buscado (dataImport.usuarios.filas) solo sale con IMPORTACION_LOG_FILAS=1.
+IMPORTACION_LOG_NIVEL = os.environ.get("IMPORTACION_LOG_NIVEL", "INFO")
+IMPORTACION_LOG_FILAS = os.environ.get("IMPORTACION_LOG_FILAS") == "1"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "simple": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "consola": {"class": "logging.StreamHandler", "formatter": "simple"},
+    },
+    "loggers": {
+        "dataImport": {"handlers": ["consola"], "level": IMPORTACION_LOG_NIVEL, "propagate": False},
+        "dataImport.usuarios.filas": {"level": "DEBUG" if IMPORTACION_LOG_FILAS else "WARNING"},
+    },
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [],  # evita cargar django.contrib.auth
     "DEFAULT_PERMISSION_CLASSES": [],      # evita permisos ligados a auth
@@ -0,0 +1,46 @@
+import threading
+
+from django.db import connection, connections
+
+
+# ================== CALENTAMIENTO DEL PROCESO ==================
+_calentado = False
+_lock = threading.Lock()
+
+
+def calentar():
+    """
+    Importa las vistas (y con ellas pandas, rapidfuzz, openpyxl, xlrd) y construye el cache de
+    usuarios, para que la primera importación no pague ese costo. Se puede llamar varias veces.
+
+    gunicorn lo llama en el proceso maestro antes de crear los workers (ver gunicorn.conf.py):
+    los workers heredan módulos y cache ya cargados.
+    """
+    global _calentado
+    with _lock:
+        if _calentado:
+            return
+        import accounts.views  # noqa: F401
+        import dataImport.views  # noqa: F401
+        from .usuarios import obtener_usuario_cache
+
+        with connection.cursor() as cursor:
+            obtener_usuario_cache(cursor)
+        _calentado = True
+
+
+def esta_listo():
+    """(listo, detalle): el proceso está calentado y la base responde"""
+    try:
+        calentar()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except Exception as e:
+        return False, str(e)
+    return True, None
+
+
+def cerrar_conexiones():
+    """Antes de crear procesos hijos: cada worker debe abrir sus propias conexiones"""
+    connections.close_all()
@@ -0,0 +1,288 @@
+import contextlib
+import datetime
+import io
+import platform
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .carga import upsert_items
+from .importacion import en_lotes, limpiar_inventario
+from .lectura import abrir_hoja
+from .sinteticos import EDIFICIOS, escribir_libro, generar_usuarios
+from .ubicaciones import IndiceUbicaciones
+from .usuarios import UsuarioCache
+
+
+# ================== BENCHMARK DE LA IMPORTACIÓN ==================
+# Mide por separado cada etapa de procesar_importacion sobre libros sintéticos (ver
+# sinteticos.py). La escritura solo se mide si hay un Postgres local de pruebas
+# (BENCH_DATABASE_URL); todo lo que se escribe ahí se deshace al terminar.
+ETAPAS = ["lectura", "limpieza", "usuarios", "ubicaciones", "escritura_altas", "escritura_sin_cambios"]
+NIVELES = ["directo", "invertido", "palabras", "fuzzy", "no_encontrado"]
+
+
+class _TablaUsuarios:
+    """Lo mínimo de un cursor para que UsuarioCache lea la tabla de usuarios sintética"""
+
+    def __init__(self, usuarios):
+        self.filas = list(enumerate(usuarios, start=1))
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return self.filas
+
+
+def commit_actual():
+    """Hash corto del commit en que se corre el benchmark (None fuera de un repo git)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextlib.contextmanager
+def _cronometro(tiempos, etapa):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tiempos[etapa] += time.perf_counter() - inicio
+
+
+def resolver_por_nivel(cache, nombres):
+    """
+    Resuelve `nombres` como resolver_nombres pero midiendo cada nivel: segundos y aciertos
+    por nivel. El tiempo de los niveles exactos se carga al nivel que encontró al usuario
+    (o a fuzzy si ninguno lo hizo).
+    """
+    segundos, aciertos = defaultdict(float), defaultdict(int)
+    resueltos, pendientes = {}, []
+    for nombre in set(nombres):
+        if not nombre or str(nombre).lower() == "nan":
+            continue
+        inicio = time.perf_counter()
+        user_id, nivel = cache._buscar_exacto_nivel(nombre.strip())
+        segundos[nivel or "fuzzy"] += time.perf_counter() - inicio
+        if user_id:
+            aciertos[nivel] += 1
+            resueltos[nombre] = user_id
+        else:
+            pendientes.append(nombre)
+
+    if pendientes:
+        inicio = time.perf_counter()
+        matches = cache.buscar_fuzzy_lote([nombre.strip() for nombre in pendientes])
+        segundos["fuzzy"] += time.perf_counter() - inicio
+        for nombre, (user_id, _) in zip(pendientes, matches):
+            aciertos["fuzzy" if user_id else "no_encontrado"] += 1
+            resueltos[nombre] = user_id or 0
+
+    return resueltos, {
+        "segundos": {nivel: round(segundos[nivel], 6) for nivel in NIVELES if nivel in segundos},
+        "aciertos": {nivel: aciertos[nivel] for nivel in NIVELES},
+    }
+
+
+def medir_importacion(contenido, nombre_archivo, cache, ubicaciones, cursor=None, tamano_lote=None):
+    """
+    Una pasada de la importación sobre `contenido` (bytes del libro). Devuelve
+    {"segundos": {etapa: s}, "filas": n, "usuarios": detalle por nivel, "escritura": resumen}.
+
+    Con `cursor` (psycopg2, dentro de una transacción que el llamador deshace) se escribe
+    dos veces cada lote con upsert_items: la primera son altas y la segunda sin_cambios.
+    """
+    tamano_lote = tamano_lote or getattr(settings, "IMPORTACION_TAMANO_LOTE", 5000)
+    tiempos = defaultdict(float)
+    por_nivel = {"segundos": defaultdict(float), "aciertos": defaultdict(int)}
+    escritura = defaultdict(int)
+    filas = 0
+
+    columnas, registros = abrir_hoja(io.BytesIO(contenido), nombre_archivo)
+    while True:
+        with _cronometro(tiempos, "lectura"):
+            lote = next(en_lotes(registros, tamano_lote), None)
+            if lote is None:
+                break
+            df = pd.DataFrame.from_records([registro for _, registro in lote], columns=columnas).fillna(np.nan)
+
+        with _cronometro(tiempos, "limpieza"):
+            df = limpiar_inventario(df, nombre_archivo)
+        filas += len(df)
+
+        with _cronometro(tiempos, "usuarios"):
+            resueltos, detalle = resolver_por_nivel(
+                cache, pd.concat([df["funcionario_que_entrega"], df["funcionario_que_recibe"]]).unique()
+            )
+            df["entregado_por_id"] = df["funcionario_que_entrega"].map(resueltos).astype("Int64")
+            df["recibido_por_id"] = df["funcionario_que_recibe"].map(resueltos).astype("Int64")
+        for clave in por_nivel:
+            for nivel, valor in detalle[clave].items():
+                por_nivel[clave][nivel] += valor
+
+        with _cronometro(tiempos, "ubicaciones"):
+            ubicacion_ids = [ubicaciones.resolver(u) if isinstance(u, str) else None for u in df["ubicacion"]]
+
+        if cursor is None:
+            continue
+
+        records = [
+            (r.inventario, r.descripcion, r.marca, float(r.valor), r.fecha_recibido, int(r.categoria),
+             ubicacion, None if pd.isna(r.entregado_por_id) else int(r.entregado_por_id),
+             int(r.recibido_por_id), 0)
+            for r, ubicacion in zip(df.itertuples(index=False), ubicacion_ids)
+            if not pd.isna(r.recibido_por_id) and r.recibido_por_id
+        ]
+        for etapa in ("escritura_altas", "escritura_sin_cambios"):
+            with _cronometro(tiempos, etapa):
+                resumen = upsert_items(cursor, records, detalle="benchmark")
+            for clave in ("nuevos", "actualizados", "sin_cambios"):
+                escritura[f"{etapa}_{clave}"] += resumen[clave]
+
+    return {
+        "segundos": {etapa: round(tiempos[etapa], 6) for etapa in ETAPAS if etapa in tiempos},
+        "filas": filas,
+        "usuarios": {
+            "segundos": {nivel: round(s, 6) for nivel, s in por_nivel["segundos"].items()},
+            "aciertos": {nivel: por_nivel["aciertos"][nivel] for nivel in NIVELES},
+        },
+        "escritura": dict(escritura) if cursor is not None else None,
+    }
+
+
+# ================== POSTGRES DE PRUEBAS ==================
+def conectar_postgres(dsn):
+    """Conexión psycopg2 al Postgres de pruebas, o None si no hay DSN o no responde"""
+    if not dsn:
+        return None
+    import psycopg2
+
+    try:
+        return psycopg2.connect(dsn, connect_timeout=5)
+    except psycopg2.OperationalError:
+        return None
+
+
+def preparar_postgres(cursor, usuarios, ruta_esquema):
+    """
+    Crea el esquema de db.sql y carga las tablas de referencia que usan los lotes. Se corre
+    dentro de la transacción del benchmark, así que nada queda en la base.
+    """
+    with open(ruta_esquema, encoding="utf-8") as archivo:
+        cursor.execute(archivo.read())
+    cursor.execute("INSERT INTO escuelas (id, nombre) VALUES (0, 'Benchmark') ON CONFLICT DO NOTHING")
+    cursor.execute("""
+        INSERT INTO categorias (id, nombre)
+        VALUES (1, 'Menores'), (2, 'Mayores'), (3, 'Intangible') ON CONFLICT DO NOTHING
+    """)
+    for i, edificio in enumerate(EDIFICIOS, start=1):
+        cursor.execute("INSERT INTO edificios (id, edificio) VALUES (%s, %s) ON CONFLICT DO NOTHING", [i, edificio])
+        cursor.execute("INSERT INTO salones (id, id_edificio) VALUES (%s, %s) ON CONFLICT DO NOTHING", [i, i])
+    cursor.execute("""
+        INSERT INTO usuarios (id, nombre, email, password_hash, rol)
+        SELECT id, nombre, 'bench' || id || '@example.com', '-', 'usuario'
+        FROM unnest(%s::integer[], %s::varchar[]) AS u(id, nombre)
+        ON CONFLICT DO NOTHING
+    """, [list(range(1, len(usuarios) + 1)), usuarios])
+
+
+# ================== CORRIDAS ==================
+def correr(filas_lista, usuarios_lista, repeticiones=3, semilla=0, dsn=None, ruta_esquema=None, avisar=print):
+    """
+    Recorre la grilla filas x usuarios y devuelve el resultado listo para guardar como JSON.
+    Cada etapa se reporta con la mediana de `repeticiones` pasadas.
+    """
+    conexion = conectar_postgres(dsn)
+    if dsn and conexion is None:
+        avisar("No se pudo conectar al Postgres de pruebas: se omite la escritura.")
+
+    corridas = []
+    try:
+        for cantidad_usuarios in usuarios_lista:
+            usuarios = generar_usuarios(cantidad_usuarios, semilla)
+            inicio = time.perf_counter()
+            cache = UsuarioCache(_TablaUsuarios(usuarios))
+            cache_segundos = time.perf_counter() - inicio
+
+            for cantidad_filas in filas_lista:
+                libro = io.BytesIO()
+                escribir_libro(libro, cantidad_filas, usuarios, usuarios[0], semilla)
+                contenido = libro.getvalue()
+
+                pasadas = []
+                for _ in range(repeticiones):
+                    cursor = None
+                    if conexion is not None:
+                        cursor = conexion.cursor()
+                        preparar_postgres(cursor, usuarios, ruta_esquema)
+                    try:
+                        pasadas.append(medir_importacion(
+                            contenido, "ElementosMenores.xlsx", cache,
+                            IndiceUbicaciones(list(enumerate(EDIFICIOS, start=1))), cursor
+                        ))
+                    finally:
+                        if conexion is not None:
+                            conexion.rollback()
+
+                corrida = {
+                    "filas": cantidad_filas,
+                    "usuarios": cantidad_usuarios,
+                    "bytes_libro": len(contenido),
+                    "cache_usuarios_segundos": round(cache_segundos, 6),
+                    "segundos": {
+                        etapa: round(statistics.median(p["segundos"][etapa] for p in pasadas), 6)
+                        for etapa in ETAPAS if etapa in pasadas[0]["segundos"]
+                    },
+                    "niveles": pasadas[0]["usuarios"]["aciertos"],
+                    "niveles_segundos": {
+                        nivel: round(statistics.median(p["usuarios"]["segundos"].get(nivel, 0) for p in pasadas), 6)
+                        for nivel in pasadas[0]["usuarios"]["segundos"]
+                    },
+                    "escritura": pasadas[0]["escritura"],
+                }
+                corrida["segundos"]["total"] = round(sum(corrida["segundos"].values()), 6)
+                corridas.append(corrida)
+                avisar(f"{cantidad_filas} filas x {cantidad_usuarios} usuarios: {corrida['segundos']}")
+    finally:
+        if conexion is not None:
+            conexion.close()
+
+    return {
+        "commit": commit_actual(),
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "maquina": platform.machine(),
+        "semilla": semilla,
+        "repeticiones": repeticiones,
+        "escritura": conexion is not None,
+        "corridas": corridas,
+    }
+
+
+def comparar(anterior, actual):
+    """
+    Líneas de texto con el cociente actual/anterior por etapa para cada (filas, usuarios)
+    presente en ambos resultados; < 1 es más rápido.
+    """
+    previas = {(c["filas"], c["usuarios"]): c for c in anterior["corridas"]}
+    lineas = [f"{anterior.get('commit')} -> {actual.get('commit')}"]
+    for corrida in actual["corridas"]:
+        previa = previas.get((corrida["filas"], corrida["usuarios"]))
+        if previa is None:
+            continue
+        cocientes = []
+        for etapa, segundos in corrida["segundos"].items():
+            antes = previa["segundos"].get(etapa)
+            if antes:
+                cocientes.append(f"{etapa}={segundos / antes:.2f}x")
+        lineas.append(f"{corrida['filas']} filas x {corrida['usuarios']} usuarios: {' '.join(cocientes)}")
+    return lineas
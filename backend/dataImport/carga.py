@@ -0,0 +1,253 @@
+import csv
+import datetime
+import io
+import json
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.db import DatabaseError
+from psycopg2.extras import execute_values
+
+from .resumen import acumular_delta, aplicar_deltas
+
+
+# ================== CARGA MASIVA EN inventario_items ==================
+COLUMNAS_ITEMS = (
+    "inventario", "descripcion", "marca", "valor", "fecha_recibido",
+    "categoria_id", "ubicacion_id", "entregado_por_id", "recibido_por_id", "escuela_id",
+)
+
+_COLUMNAS_SQL = ", ".join(COLUMNAS_ITEMS)
+_ACTUALIZAR_SQL = ",\n            ".join(f"{c} = EXCLUDED.{c}" for c in COLUMNAS_ITEMS if c != "inventario")
+
+# Solo reescribe la fila si algo cambió; RETURNING distingue altas (xmax = 0) de actualizaciones
+_ON_CONFLICT_SQL = f"""ON CONFLICT (inventario) DO UPDATE SET
+            {_ACTUALIZAR_SQL}
+        WHERE ({", ".join(f"inventario_items.{c}" for c in COLUMNAS_ITEMS[1:])})
+            IS DISTINCT FROM ({", ".join(f"EXCLUDED.{c}" for c in COLUMNAS_ITEMS[1:])})
+        RETURNING id, inventario, (xmax = 0) AS insertado"""
+
+
+class CargaConcurrente(DatabaseError):
+    """
+    Otra importación creó alguno de los inventarios del lote entre la lectura y el UPSERT: no
+    se conoce la fila que se reemplazó, así que el delta del resumen no se puede calcular
+    """
+
+
+# Marcador de NULL para COPY; así un string vacío sigue siendo string vacío
+_NULO_COPY = r"\N"
+
+
+def upsert_items(cursor, records, usuario_id=None, detalle=None):
+    """
+    UPSERT de `records` (tuplas en el orden de COLUMNAS_ITEMS) en inventario_items.
+
+    Solo se escriben las filas nuevas o con algún campo distinto al guardado; por cada una se
+    agrega una fila en inventario_trazabilidad ("alta" o "actualizacion") con el diff de
+    campos en `meta`, y su delta se aplica a inventario_resumen. Si un inventario se repite en
+    `records` gana la última fila.
+
+    Desde CARGA_COPY_MIN_FILAS filas a escribir usa COPY a una tabla temporal y un único
+    INSERT ... SELECT; por debajo se queda con execute_values. Si otra importación crea a la
+    vez alguno de los inventarios levanta CargaConcurrente, sin tocar el resumen. Acepta un cursor de Django o
+    uno de psycopg2: los errores pueden llegar como DatabaseError o psycopg2.Error. Devuelve un resumen con el
+    motor usado y las cantidades de nuevos, actualizados y sin_cambios.
+    """
+    resumen = {"motor": None, "nuevos": 0, "actualizados": 0, "sin_cambios": 0}
+    if not records:
+        return resumen
+
+    por_inventario = {}
+    for record in records:
+        por_inventario[record[0]] = record
+
+    anteriores = _leer_actuales(cursor, list(por_inventario))
+    cambiados = [
+        record for inventario, record in por_inventario.items()
+        if inventario not in anteriores or _diferencias(anteriores[inventario], record)
+    ]
+    resumen["sin_cambios"] = len(por_inventario) - len(cambiados)
+    if not cambiados:
+        return resumen
+
+    if len(cambiados) >= getattr(settings, "CARGA_COPY_MIN_FILAS", 5000):
+        resumen["motor"] = "copy"
+        escritos = _upsert_copy(cursor, cambiados)
+    else:
+        resumen["motor"] = "execute_values"
+        escritos = _upsert_execute_values(cursor, cambiados)
+
+    # Lo que el WHERE del ON CONFLICT descartó (cambió entre la lectura y la escritura) tampoco cuenta
+    resumen["sin_cambios"] += len(cambiados) - len(escritos)
+
+    # Llegó como actualización algo que no se leyó: lo insertó otra importación después de
+    # _leer_actuales. Sin sus valores anteriores el resumen quedaría corrido; el llamador
+    # deshace el lote (savepoint) y lo reporta para reintentarlo.
+    carrera = sorted(inventario for _, inventario, insertado in escritos if not insertado and inventario not in anteriores)
+    if carrera:
+        raise CargaConcurrente(
+            f"{len(carrera)} inventarios fueron creados por otra importación mientras se escribía este lote "
+            f"(p. ej. {', '.join(carrera[:5])}); vuelve a importar el archivo."
+        )
+
+    trazas, deltas, usuarios = [], {}, set()
+    for item_id, inventario, insertado in escritos:
+        anterior = None if insertado else anteriores.get(inventario)
+        # Cambia el inventario de quien lo recibe ahora y de quien lo tenía antes
+        usuarios.add(por_inventario[inventario][COLUMNAS_ITEMS.index("recibido_por_id")])
+        if anterior:
+            usuarios.add(anterior["recibido_por_id"])
+        accion = "alta" if insertado else "actualizacion"
+        resumen["nuevos" if insertado else "actualizados"] += 1
+        cambios = _diferencias(anterior, por_inventario[inventario])
+        trazas.append((item_id, accion, detalle, usuario_id, json.dumps({"cambios": cambios})))
+        acumular_delta(deltas, anterior, dict(zip(COLUMNAS_ITEMS, por_inventario[inventario])))
+    _registrar_trazabilidad(cursor, trazas)
+    aplicar_deltas(cursor, deltas)
+    _incrementar_versiones(cursor, usuarios)
+
+    return resumen
+
+
+# ================== DETECCIÓN DE CAMBIOS ==================
+def _leer_actuales(cursor, inventarios):
+    """
+    {inventario: {columna: valor}} de los items que ya existen. FOR UPDATE: nadie más los
+    cambia hasta el COMMIT, así el diff (y el delta del resumen) parte de lo que se reemplaza.
+    """
+    cursor.execute(f"""
+        SELECT {_COLUMNAS_SQL}
+        FROM inventario_items
+        WHERE inventario = ANY(%s)
+        FOR UPDATE
+    """, [inventarios])
+    return {fila[0]: dict(zip(COLUMNAS_ITEMS, fila)) for fila in cursor.fetchall()}
+
+
+def _comparable(columna, valor):
+    """Lleva el valor del archivo y el de la base a un mismo tipo para compararlos"""
+    if valor is None:
+        return None
+    if columna == "valor":
+        return Decimal(str(valor))
+    if columna == "fecha_recibido":
+        return str(valor)[:10]
+    if columna.endswith("_id"):
+        return int(valor)
+    return str(valor)
+
+
+def _a_json(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _diferencias(anterior, record):
+    """{columna: {"antes", "despues"}} de los campos que cambian; `anterior` None es un alta"""
+    cambios = {}
+    for columna, nuevo in zip(COLUMNAS_ITEMS[1:], record[1:]):
+        viejo = anterior[columna] if anterior else None
+        try:
+            iguales = _comparable(columna, viejo) == _comparable(columna, nuevo)
+        except (ValueError, ArithmeticError):
+            iguales = False  # ante la duda se escribe; el WHERE del UPSERT decide
+        if not iguales:
+            cambios[columna] = {"antes": _a_json(viejo), "despues": _a_json(nuevo)}
+    return cambios
+
+
+def _registrar_trazabilidad(cursor, trazas):
+    if not trazas:
+        return
+    execute_values(cursor, """
+        INSERT INTO inventario_trazabilidad (inventario, accion, detalle, usuario_id, meta)
+        VALUES %s
+        """,
+        trazas,
+        template="(%s, %s, %s, %s, %s::jsonb)",
+    )
+
+
+def _incrementar_versiones(cursor, usuarios):
+    """+1 a inventario_versiones de cada usuario (el ETag de su listado deja de coincidir)"""
+    usuarios = sorted(int(u) for u in usuarios if u is not None)  # orden fijo de bloqueo, como el resumen
+    if not usuarios:
+        return
+    cursor.execute("""
+        INSERT INTO inventario_versiones (usuario_id, version)
+        SELECT unnest(%s::integer[]), 1
+        ON CONFLICT (usuario_id) DO UPDATE SET version = inventario_versiones.version + 1
+    """, [usuarios])
+
+
+# ================== MOTORES DE ESCRITURA ==================
+def _upsert_execute_values(cursor, records):
+    return execute_values(cursor, f"""
+        INSERT INTO inventario_items ({_COLUMNAS_SQL})
+        VALUES %s
+        {_ON_CONFLICT_SQL}
+        """,
+        records,
+        fetch=True,
+    )
+
+
+class _FlujoCSV(io.RawIOBase):
+    """Archivo de solo lectura que va generando el CSV de `records` a medida que COPY lo pide"""
+
+    def __init__(self, records, filas_por_bloque=1000):
+        self._records = iter(records)
+        self._filas_por_bloque = filas_por_bloque
+        self._pendiente = b""
+
+    def readable(self):
+        return True
+
+    def _siguiente_bloque(self):
+        texto = io.StringIO()
+        escritor = csv.writer(texto, lineterminator="\n")
+        for record in islice(self._records, self._filas_por_bloque):
+            escritor.writerow([_NULO_COPY if v is None else v for v in record])
+        return texto.getvalue().encode("utf-8")
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pendiente) < size:
+            bloque = self._siguiente_bloque()
+            if not bloque:
+                break
+            self._pendiente += bloque
+        if size < 0:
+            size = len(self._pendiente)
+        datos, self._pendiente = self._pendiente[:size], self._pendiente[size:]
+        return datos
+
+
+def _upsert_copy(cursor, records):
+    # ON COMMIT DROP: la tabla vive solo en esta transacción, compatible con el pooler en modo transacción
+    cursor.execute(f"""
+        CREATE TEMP TABLE inventario_items_carga ON COMMIT DROP AS
+        SELECT {_COLUMNAS_SQL}, 0::bigint AS orden
+        FROM inventario_items
+        WITH NO DATA
+    """)
+    # copy_expert va directo a psycopg2: sus errores llegan como psycopg2.Error (ver quien llama)
+    cursor.copy_expert(
+        f"COPY inventario_items_carga ({_COLUMNAS_SQL}, orden) FROM STDIN WITH (FORMAT csv, NULL '{_NULO_COPY}')",
+        _FlujoCSV(record + (orden,) for orden, record in enumerate(records)),
+    )
+    # Si el archivo repite un inventario gana la última fila
+    cursor.execute(f"""
+        INSERT INTO inventario_items ({_COLUMNAS_SQL})
+        SELECT DISTINCT ON (inventario) {_COLUMNAS_SQL}
+        FROM inventario_items_carga
+        ORDER BY inventario, orden DESC
+        {_ON_CONFLICT_SQL}
+    """)
+    escritos = cursor.fetchall()
+    cursor.execute("DROP TABLE inventario_items_carga")
+    return escritos
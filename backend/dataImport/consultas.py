@@ -0,0 +1,360 @@
+import base64
+import csv
+import datetime
+import hashlib
+import io
+import json
+
+from django.db import connection, transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+from .usuarios import quitar_tildes
+
+
+# ================== LISTADO DE INVENTARIO ==================
+# campo de salida -> (expresión SQL, JOIN que necesita)
+CAMPOS_INVENTARIO = {
+    "inventario": ("ii.inventario", None),
+    "descripcion": ("ii.descripcion", None),
+    "marca": ("ii.marca", None),
+    "valor": ("ii.valor", None),
+    "fecha_recibido": ("ii.fecha_recibido", None),
+    "categoria": ("c.nombre", "LEFT JOIN categorias c ON ii.categoria_id = c.id"),
+    "ubicacion": ("e.edificio", "LEFT JOIN edificios e ON ii.ubicacion_id = e.id"),
+    "entregado_por": ("ue.nombre", "LEFT JOIN usuarios ue ON ii.entregado_por_id = ue.id"),
+    "recibido_por": ("ur.nombre", "LEFT JOIN usuarios ur ON ii.recibido_por_id = ur.id"),
+    "escuela": ("esc.nombre", "LEFT JOIN escuelas esc ON ii.escuela_id = esc.id"),
+}
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+
+
+class ParametroInvalido(ValueError):
+    """Parámetro de consulta mal formado; las vistas lo devuelven como 400"""
+
+
+def parsear_campos(texto):
+    """`fields=a,b,c` -> lista de campos válidos; vacío = todos"""
+    if not texto:
+        return list(CAMPOS_INVENTARIO)
+    campos = [c.strip() for c in texto.split(",") if c.strip()]
+    desconocidos = [c for c in campos if c not in CAMPOS_INVENTARIO]
+    if desconocidos:
+        raise ParametroInvalido(f"Campos desconocidos: {', '.join(desconocidos)}")
+    return campos
+
+
+def _fecha(texto, nombre):
+    try:
+        return datetime.date.fromisoformat(texto)
+    except ValueError:
+        raise ParametroInvalido(f"'{nombre}' debe tener formato AAAA-MM-DD")
+
+
+def _entero(texto, nombre):
+    try:
+        return int(texto)
+    except ValueError:
+        raise ParametroInvalido(f"'{nombre}' debe ser un número entero")
+
+
+def parsear_filtros(params):
+    """Filtros opcionales: categoria (id), edificio (id), desde/hasta (fecha_recibido)"""
+    filtros = {}
+    if params.get("categoria"):
+        filtros["categoria"] = _entero(params["categoria"], "categoria")
+    if params.get("edificio"):
+        filtros["edificio"] = _entero(params["edificio"], "edificio")
+    if params.get("desde"):
+        filtros["desde"] = _fecha(params["desde"], "desde")
+    if params.get("hasta"):
+        filtros["hasta"] = _fecha(params["hasta"], "hasta")
+    return filtros
+
+
+def parsear_limite(texto):
+    if not texto:
+        return LIMITE_POR_DEFECTO
+    limite = _entero(texto, "limite")
+    if limite < 1:
+        raise ParametroInvalido("'limite' debe ser mayor que cero")
+    return min(limite, LIMITE_MAXIMO)
+
+
+def codificar_cursor(fecha_recibido, item_id):
+    """Cursor opaco con la posición (fecha_recibido, id) del último item entregado"""
+    posicion = [fecha_recibido.isoformat() if fecha_recibido else None, item_id]
+    return base64.urlsafe_b64encode(json.dumps(posicion).encode()).decode()
+
+
+def decodificar_cursor(texto):
+    if not texto:
+        return None
+    try:
+        fecha, item_id = json.loads(base64.urlsafe_b64decode(texto.encode()))
+        return (datetime.date.fromisoformat(fecha) if fecha else None), int(item_id)
+    except (ValueError, TypeError):
+        raise ParametroInvalido("Cursor inválido")
+
+
+def construir_consulta_inventario(user_id, campos, filtros, posicion=None, sin_fecha=False, limite=None):
+    """
+    SELECT de los items recibidos por `user_id`, más recientes primero.
+
+    Solo hace los JOIN de los campos pedidos. Además de `campos` devuelve ii.id y
+    ii.fecha_recibido (al final) para armar el cursor. El orden (fecha_recibido DESC, id DESC)
+    coincide con idx_inventario_items_recibido_fecha, así cada página es un rango del índice.
+    Las filas sin fecha no entran en la comparación por fila: se piden aparte con
+    `sin_fecha=True`, ordenadas solo por id.
+    """
+    columnas = [f"{CAMPOS_INVENTARIO[c][0]} AS {c}" for c in campos]
+    joins = [CAMPOS_INVENTARIO[c][1] for c in campos if CAMPOS_INVENTARIO[c][1]]
+
+    condiciones = ["ii.recibido_por_id = %s"]
+    params = [user_id]
+    if "categoria" in filtros:
+        condiciones.append("ii.categoria_id = %s")
+        params.append(filtros["categoria"])
+    if "edificio" in filtros:
+        condiciones.append("ii.ubicacion_id = %s")
+        params.append(filtros["edificio"])
+    if "desde" in filtros:
+        condiciones.append("ii.fecha_recibido >= %s")
+        params.append(filtros["desde"])
+    if "hasta" in filtros:
+        condiciones.append("ii.fecha_recibido <= %s")
+        params.append(filtros["hasta"])
+
+    if sin_fecha:
+        condiciones.append("ii.fecha_recibido IS NULL")
+        if posicion:
+            condiciones.append("ii.id < %s")
+            params.append(posicion[1])
+        orden = "ii.id DESC"
+    else:
+        if posicion:
+            condiciones.append("(ii.fecha_recibido, ii.id) < (%s, %s)")
+            params.extend(posicion)
+        else:
+            condiciones.append("ii.fecha_recibido IS NOT NULL")
+        orden = "ii.fecha_recibido DESC, ii.id DESC"
+
+    sql = f"""
+        SELECT {", ".join(columnas + ["ii.id", "ii.fecha_recibido"])}
+        FROM inventario_items ii
+        {" ".join(joins)}
+        WHERE {" AND ".join(condiciones)}
+        ORDER BY {orden}
+    """
+    if limite is not None:
+        sql += " LIMIT %s"
+        params.append(limite)
+    return sql, params
+
+
+def pagina_inventario(cursor, user_id, campos, filtros, posicion=None, limite=LIMITE_POR_DEFECTO):
+    """
+    Una página del inventario del usuario a partir de `posicion` (ver decodificar_cursor).
+
+    Devuelve (items, siguiente_cursor); siguiente_cursor es None en la última página.
+    """
+    filas = []
+    posicion_nulos = posicion
+    # Primero las filas con fecha; cuando se acaban, las que no tienen (van al final)
+    if posicion is None or posicion[0] is not None:
+        sql, params = construir_consulta_inventario(user_id, campos, filtros, posicion, limite=limite + 1)
+        cursor.execute(sql, params)
+        filas = cursor.fetchall()
+        posicion_nulos = None
+
+    # Un filtro por fecha nunca incluye filas sin fecha
+    if len(filas) <= limite and "desde" not in filtros and "hasta" not in filtros:
+        sql, params = construir_consulta_inventario(
+            user_id, campos, filtros, posicion_nulos, sin_fecha=True, limite=limite + 1 - len(filas)
+        )
+        cursor.execute(sql, params)
+        filas += cursor.fetchall()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        item_id, fecha_recibido = filas[-1][-2:]
+        siguiente = codificar_cursor(fecha_recibido, item_id)
+
+    items = [dict(zip(campos, fila)) for fila in filas]
+    return items, siguiente
+
+
+# ================== BÚSQUEDA ==================
+# mios: items recibidos por el usuario; escuela: todos los de su escuela
+ALCANCES_BUSQUEDA = ("mios", "escuela")
+
+
+def normalizar_busqueda(texto):
+    """Lo mismo que normalizar_busqueda() en la base: sin tildes, en minúsculas y sin espacios extra"""
+    return " ".join(quitar_tildes(texto or "").lower().split())
+
+
+def parsear_busqueda(params):
+    """(texto normalizado, alcance) de `q` y `alcance`"""
+    texto = normalizar_busqueda(params.get("q"))
+    if not texto:
+        raise ParametroInvalido("Falta el texto a buscar ('q')")
+    alcance = params.get("alcance") or "mios"
+    if alcance not in ALCANCES_BUSQUEDA:
+        raise ParametroInvalido(f"'alcance' debe ser {' o '.join(ALCANCES_BUSQUEDA)}")
+    return texto, alcance
+
+
+def codificar_cursor_busqueda(puntaje, item_id):
+    return base64.urlsafe_b64encode(json.dumps([puntaje, item_id]).encode()).decode()
+
+
+def decodificar_cursor_busqueda(texto):
+    if not texto:
+        return None
+    try:
+        puntaje, item_id = json.loads(base64.urlsafe_b64decode(texto.encode()))
+        return float(puntaje), int(item_id)
+    except (ValueError, TypeError):
+        raise ParametroInvalido("Cursor inválido")
+
+
+def construir_consulta_busqueda(user_id, texto, campos, alcance="mios", posicion=None, limite=LIMITE_POR_DEFECTO):
+    """
+    Items que coinciden con `texto` (ya normalizado), del más relevante al menos.
+
+    Coinciden por texto completo (ii.busqueda, índice GIN) o por similitud de trigramas
+    contra ii.busqueda_texto (gin_trgm_ops), que tolera errores de tipeo. La relevancia es
+    ts_rank + word_similarity. Los JOIN de `campos` solo se hacen para la página pedida.
+    Devuelve `campos` más ii.id y el puntaje al final, para armar el cursor.
+    """
+    columnas = [f"{CAMPOS_INVENTARIO[c][0]} AS {c}" for c in campos]
+    joins = [CAMPOS_INVENTARIO[c][1] for c in campos if CAMPOS_INVENTARIO[c][1]]
+
+    if alcance == "escuela":
+        alcance_sql = "ii.escuela_id = (SELECT escuela_id FROM usuarios WHERE id = %s)"
+    else:
+        alcance_sql = "ii.recibido_por_id = %s"
+
+    params = [texto, texto, user_id, texto, texto]
+    pagina = ""
+    if posicion:
+        pagina = "WHERE (b.puntaje, b.id) < (%s, %s)"
+        params.extend(posicion)
+    params.append(limite + 1)
+
+    sql = f"""
+        SELECT {", ".join(columnas + ["ii.id", "b.puntaje"])}
+        FROM (
+            SELECT ii.id,
+                   (ts_rank(ii.busqueda, websearch_to_tsquery('spanish', %s))
+                    + word_similarity(%s, ii.busqueda_texto))::float8 AS puntaje
+            FROM inventario_items ii
+            WHERE {alcance_sql}
+              AND (ii.busqueda @@ websearch_to_tsquery('spanish', %s) OR %s <%% ii.busqueda_texto)
+        ) b
+        JOIN inventario_items ii ON ii.id = b.id
+        {" ".join(joins)}
+        {pagina}
+        ORDER BY b.puntaje DESC, b.id DESC
+        LIMIT %s
+    """
+    return sql, params
+
+
+def pagina_busqueda(cursor, user_id, texto, campos, alcance="mios", posicion=None, limite=LIMITE_POR_DEFECTO):
+    """Una página de resultados; devuelve (items, siguiente_cursor) como pagina_inventario"""
+    sql, params = construir_consulta_busqueda(user_id, texto, campos, alcance, posicion, limite)
+    cursor.execute(sql, params)
+    filas = cursor.fetchall()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        item_id, puntaje = filas[-1][-2:]
+        siguiente = codificar_cursor_busqueda(puntaje, item_id)
+
+    items = [{**dict(zip(campos, fila)), "relevancia": round(fila[-1], 4)} for fila in filas]
+    return items, siguiente
+
+
+# ================== VERSIÓN DEL INVENTARIO (ETag) ==================
+def version_inventario(cursor, user_id):
+    """
+    Versión del inventario del usuario: un contador que carga.upsert_items incrementa en la
+    misma transacción en que cambia alguno de sus items (también los que deja de recibir).
+    Es una lectura por clave primaria; 0 si nunca se le escribió nada.
+    """
+    cursor.execute("SELECT version FROM inventario_versiones WHERE usuario_id = %s", [user_id])
+    fila = cursor.fetchone()
+    return fila[0] if fila else 0
+
+
+def etag_inventario(user_id, version, params):
+    """ETag débil: versión del inventario más los parámetros que cambian la respuesta"""
+    clave = json.dumps([user_id, version, sorted(params.items())])
+    return f'W/"{hashlib.sha256(clave.encode()).hexdigest()[:32]}"'
+
+
+def etag_coincide(etag, if_none_match):
+    """Compara con If-None-Match (lista separada por comas o *), con comparación débil"""
+    if not if_none_match:
+        return False
+    etiquetas = [e.strip() for e in if_none_match.split(",")]
+    return "*" in etiquetas or etag.removeprefix("W/") in (e.removeprefix("W/") for e in etiquetas)
+
+
+# ================== VOLCADO COMPLETO (STREAMING) ==================
+# Filas que se piden al cursor del servidor en cada vuelta
+TAMANO_BLOQUE_VOLCADO = 2000
+
+FORMATOS_VOLCADO = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def volcar_inventario(user_id, campos, filtros, tamano_bloque=TAMANO_BLOQUE_VOLCADO):
+    """
+    Genera bloques de filas (solo `campos`) con todo el inventario del usuario, en el mismo
+    orden que las páginas de pagina_inventario.
+
+    Usa un cursor con nombre del lado del servidor dentro de una transacción: el cursor no
+    sobrevive al COMMIT, así que funciona detrás del pooler en modo transacción, y en memoria
+    solo hay un bloque a la vez.
+    """
+    consultas = [construir_consulta_inventario(user_id, campos, filtros)]
+    if "desde" not in filtros and "hasta" not in filtros:
+        consultas.append(construir_consulta_inventario(user_id, campos, filtros, sin_fecha=True))
+
+    with transaction.atomic():
+        for sql, params in consultas:
+            with connection.chunked_cursor() as cursor:
+                cursor.execute(sql, params)
+                while True:
+                    filas = cursor.fetchmany(tamano_bloque)
+                    if not filas:
+                        break
+                    yield [fila[:len(campos)] for fila in filas]
+
+
+def volcado_ndjson(campos, bloques):
+    """Un objeto JSON por línea"""
+    codificador = JSONEncoder(ensure_ascii=False)
+    for filas in bloques:
+        yield "".join(codificador.encode(dict(zip(campos, fila))) + "\n" for fila in filas)
+
+
+def volcado_csv(campos, bloques):
+    """Encabezados y luego un bloque de líneas CSV por bloque de filas"""
+    texto = io.StringIO()
+    escritor = csv.writer(texto, lineterminator="\n")
+    escritor.writerow(campos)
+    yield texto.getvalue()
+    for filas in bloques:
+        texto.seek(0)
+        texto.truncate()
+        escritor.writerows(filas)
+        yield texto.getvalue()
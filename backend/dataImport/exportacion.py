@@ -0,0 +1,112 @@
+import csv
+import io
+import tempfile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+from .consultas import volcar_inventario
+from .importacion import CATEGORIA_MAP
+from .lectura import COLUMNAS_PLANTILLA
+
+
+# ================== EXPORTACIÓN EN FORMATO PLANTILLA ==================
+# columna de la plantilla -> campo de consultas.CAMPOS_INVENTARIO
+CAMPOS_PLANTILLA = {
+    "Inventario": "inventario",
+    "Descripción": "descripcion",
+    "Marca": "marca",
+    "Valor": "valor",
+    "Fecha Recibido": "fecha_recibido",
+    "Categoría": "categoria",
+    "Ubicación": "ubicacion",
+    "FUNCIONARIO QUE ENTREGA": "entregado_por",
+    "FUNCIONARIO QUE RECIBE": "recibido_por",
+}
+
+FORMATOS_EXPORTACION = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+
+FORMATO_FECHA = "%d/%m/%Y"  # la importación lee las fechas con dayfirst=True
+
+
+def _titulo(filtros):
+    """
+    Título de la hoja; también va en el nombre del archivo. Al volver a importar, cada fila
+    conserva la categoría de su columna Categoría; el nombre solo cuenta si esa celda está vacía.
+    """
+    for nombre, categoria_id in CATEGORIA_MAP.items():
+        if filtros.get("categoria") == categoria_id:
+            return f"Elementos {nombre}"
+    return "Inventario"
+
+
+def preambulo(filtros):
+    """Las 7 filas que preceden a los encabezados en los archivos del sistema financiero"""
+    filas = [[] for _ in range(7)]
+    filas[0] = [None, None, None, None, "Sistema de Información Financiero"]
+    filas[1] = [None, None, None, None, "Consulta Inventarios"]
+    filas[3] = [None, None, None, None, _titulo(filtros)]
+    return filas
+
+
+def nombre_archivo(filtros, formato):
+    return f"{_titulo(filtros).replace(' ', '')}.{formato}"
+
+
+def filas_plantilla(user_id, filtros):
+    """Bloques de filas con las columnas de COLUMNAS_PLANTILLA, leídos con un cursor del servidor"""
+    campos = [CAMPOS_PLANTILLA[c] for c in COLUMNAS_PLANTILLA]
+    return volcar_inventario(user_id, campos, filtros)
+
+
+def exportar_xlsx(user_id, filtros):
+    """
+    Escribe el .xlsx en un archivo temporal y lo devuelve abierto al inicio.
+
+    openpyxl en modo write_only va volcando cada fila a disco, así que la memoria no depende
+    del tamaño del inventario. Un .xlsx es un zip y solo se puede entregar cuando está
+    completo: la vista lo envía por partes desde el archivo temporal.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(_titulo(filtros)[:31])
+    for fila in preambulo(filtros):
+        hoja.append(fila)
+    hoja.append(COLUMNAS_PLANTILLA)
+
+    columna_fecha = COLUMNAS_PLANTILLA.index("Fecha Recibido")
+    for filas in filas_plantilla(user_id, filtros):
+        for fila in filas:
+            fila = list(fila)
+            if fila[columna_fecha] is not None:
+                celda = WriteOnlyCell(hoja, fila[columna_fecha])
+                celda.number_format = "DD/MM/YYYY"
+                fila[columna_fecha] = celda
+            hoja.append(fila)
+
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def exportar_csv(user_id, filtros):
+    """Genera el CSV por bloques: preámbulo, encabezados y luego las filas"""
+    texto = io.StringIO()
+    escritor = csv.writer(texto, lineterminator="\n")
+    escritor.writerows(preambulo(filtros))
+    escritor.writerow(COLUMNAS_PLANTILLA)
+    yield texto.getvalue()
+
+    columna_fecha = COLUMNAS_PLANTILLA.index("Fecha Recibido")
+    for filas in filas_plantilla(user_id, filtros):
+        texto.seek(0)
+        texto.truncate()
+        for fila in filas:
+            fila = list(fila)
+            if fila[columna_fecha] is not None:
+                fila[columna_fecha] = fila[columna_fecha].strftime(FORMATO_FECHA)
+            escritor.writerow(fila)
+        yield texto.getvalue()
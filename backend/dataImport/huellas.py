@@ -0,0 +1,106 @@
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from rest_framework.utils.encoders import JSONEncoder
+
+from accounts.cache import CacheTTL
+
+from .importacion import validateCategory
+
+
+# ================== IMPORTACIONES YA PROCESADAS ==================
+# Huella (sha256) de cada archivo importado con éxito, con el usuario y el resultado. Si el
+# mismo archivo vuelve a subirse (p. ej. tras un timeout) se devuelve el resultado guardado
+# sin leerlo. La clave lleva la categoría que sale del nombre: los mismos bytes con otro
+# nombre de categoría son otra importación.
+_recientes = CacheTTL(
+    getattr(settings, "IMPORTACION_HUELLAS_MAXIMO", 500),
+    getattr(settings, "IMPORTACION_HUELLAS_TTL_SEGUNDOS", 3600),
+)
+
+
+def huella_archivo(archivo):
+    """sha256 del contenido (bytes, UploadedFile o archivo abierto); deja el archivo al inicio"""
+    digest = hashlib.sha256()
+    if isinstance(archivo, bytes):
+        digest.update(archivo)
+        return digest.hexdigest()
+    archivo.seek(0)
+    partes = archivo.chunks() if hasattr(archivo, "chunks") else iter(lambda: archivo.read(1024 * 1024), b"")
+    for parte in partes:
+        digest.update(parte)
+    archivo.seek(0)
+    return digest.hexdigest()
+
+
+def _clave(usuario_id, huella, nombre_archivo):
+    return usuario_id, huella, validateCategory(nombre_archivo)
+
+
+def exitosa(respuesta, status_http):
+    """Solo se recuerdan importaciones completas: 2xx y ningún lote con error"""
+    return status_http < 300 and respuesta.get("status") == "ok" and not respuesta.get("lotes_con_error")
+
+
+def buscar_importacion(usuario_id, huella, nombre_archivo):
+    """(respuesta, status_http) guardada para ese archivo, o None. Primero en memoria, luego en la base"""
+    clave = _clave(usuario_id, huella, nombre_archivo)
+    guardada = _recientes.obtener(clave)
+    if guardada is not None:
+        return guardada
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT resultado, status_http, archivo, importado
+                FROM importacion_archivos
+                WHERE usuario_id = %s AND huella = %s AND categoria_id = %s
+            """, list(clave))
+            fila = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if fila is None:
+        return None
+
+    resultado, status_http, archivo, importado = fila
+    guardada = _como_repetida(resultado, archivo, importado), status_http
+    _recientes.guardar(clave, guardada)
+    return guardada
+
+
+def guardar_importacion(usuario_id, huella, nombre_archivo, respuesta, status_http):
+    """Registra una importación exitosa; si la base falla solo queda en memoria"""
+    if not exitosa(respuesta, status_http):
+        return
+    clave = _clave(usuario_id, huella, nombre_archivo)
+    importado = datetime.datetime.now(datetime.timezone.utc)
+    _recientes.guardar(clave, (_como_repetida(respuesta, nombre_archivo, importado), status_http))
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO importacion_archivos (usuario_id, huella, categoria_id, archivo, resultado, status_http, importado)
+                VALUES (%s, %s, %s, %s, %s::jsonb, %s, %s)
+                ON CONFLICT (usuario_id, huella, categoria_id) DO UPDATE SET
+                    archivo = EXCLUDED.archivo,
+                    resultado = EXCLUDED.resultado,
+                    status_http = EXCLUDED.status_http,
+                    importado = EXCLUDED.importado
+            """, [*clave, nombre_archivo, json.dumps(respuesta, cls=JSONEncoder), status_http, importado])
+    except DatabaseError:
+        pass
+
+
+def _como_repetida(respuesta, nombre_archivo, importado):
+    return {
+        **respuesta,
+        "repetida": True,
+        "importacion_original": {"archivo": nombre_archivo, "fecha": importado.isoformat()},
+    }
+
+
+def olvidar_importaciones():
+    """Vacía la memoria de huellas del proceso (la tabla queda igual)"""
+    _recientes.vaciar()
@@ -0,0 +1,514 @@
+from collections import defaultdict
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from rest_framework import status
+
+from .carga import upsert_items
+from .lectura import abrir_hoja
+from .metricas import MetricasImportacion
+from .ubicaciones import cargar_ubicaciones
+from .usuarios import obtener_usuario_cache, quitar_tildes
+
+
+def normalize_key(key: str) -> str:
+    return (
+        key.strip()
+        .lower()
+        .replace(" ", "_")
+        .replace("ó", "o")
+        .replace("í", "i")
+        .replace("ú", "u")
+        .replace("é", "e")
+        .replace("á", "a")
+    )
+
+# ================== CATEGORÍAS ==================
+CATEGORIA_MAP = {
+    "Menores": 1,
+    "Mayores": 2,
+    "Intangible": 3,
+}
+
+
+# ================== VALIDACION CATEGORÍA ==================
+def validateCategory(nombreArchivo):
+    if "Menores" in nombreArchivo:
+        return CATEGORIA_MAP["Menores"]
+    if "Mayores" in nombreArchivo:
+        return CATEGORIA_MAP["Mayores"]
+    else:
+        return CATEGORIA_MAP["Intangible"]
+
+
+def categoria_de_celda(valor):
+    """
+    Id de categoría de una celda de la columna Categoría ("Menores", "Elementos Mayores", "2"...),
+    sin importar tildes ni mayúsculas; None si no se reconoce.
+    """
+    if isinstance(valor, (int, float)) and not pd.isna(valor):
+        valor = str(int(valor))
+    if not isinstance(valor, str):
+        return None
+    texto = quitar_tildes(valor).strip().lower()
+    if texto.isdigit():
+        return int(texto) if int(texto) in CATEGORIA_MAP.values() else None
+    for nombre, categoria_id in CATEGORIA_MAP.items():
+        if nombre.lower() in texto:
+            return categoria_id
+    return None
+
+
+# ================== LIMPIEZA ==================
+COLUMNAS_LIMPIAS = [
+    "Inventario", "Descripción", "Marca", "Valor", "Fecha Recibido", "Categoría",
+    "Ubicación", "FUNCIONARIO QUE ENTREGA", "FUNCIONARIO QUE RECIBE"
+]
+
+# Formatos de fecha que se prueban en cada columna, en orden; el día va antes que el mes
+FORMATOS_FECHA = [
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y", "%d/%m/%Y %H:%M:%S", "%d-%m-%Y", "%d/%m/%y", "%d.%m.%Y",
+]
+MUESTRA_FORMATO_FECHA = 200
+FECHA_POR_DEFECTO = pd.Timestamp("2000-01-01")
+
+
+def _texto(columna):
+    """La columna como texto recortado; las celdas vacías quedan como "nan", como con astype(str)"""
+    if pd.api.types.infer_dtype(columna, skipna=True) == "string":
+        return columna.str.strip().fillna("nan")
+    return columna.astype(str).str.strip()
+
+
+def detectar_formato_fecha(textos):
+    """El formato de FORMATOS_FECHA que más valores de la muestra entiende, o None"""
+    muestra = textos.iloc[:MUESTRA_FORMATO_FECHA]
+    mejor, aciertos_mejor = None, 0
+    for formato in FORMATOS_FECHA:
+        aciertos = pd.to_datetime(muestra, format=formato, errors="coerce").notna().sum()
+        if aciertos > aciertos_mejor:
+            mejor, aciertos_mejor = formato, aciertos
+            if aciertos == len(muestra):
+                break
+    return mejor
+
+
+def parsear_fechas(columna):
+    """
+    Fechas de una columna cruda: las celdas fecha se toman tal cual y las de texto con el
+    formato detectado una vez para toda la columna. Lo que no sigue ese formato se intenta
+    con día primero; lo que no se entiende queda NaT.
+    """
+    fechas = pd.Series(pd.NaT, index=columna.index, dtype="datetime64[ns]")
+    es_texto = columna.map(type) == str
+    if (~es_texto & columna.notna()).any():
+        fechas[~es_texto] = pd.to_datetime(columna[~es_texto], errors="coerce")
+
+    if es_texto.any():
+        textos = columna[es_texto].str.strip()
+        formato = detectar_formato_fecha(textos)
+        if formato:
+            fechas[es_texto] = pd.to_datetime(textos, format=formato, errors="coerce")
+        restantes = es_texto & fechas.isna()
+        if restantes.any():
+            fechas[restantes] = pd.to_datetime(columna[restantes], errors="coerce", dayfirst=True, format="mixed")
+    return fechas
+
+
+def parsear_valores(columna):
+    """Montos como float: de los textos se quitan símbolos y separadores de miles ('$ 1,200.50')"""
+    if pd.api.types.is_numeric_dtype(columna):
+        return pd.to_numeric(columna, errors="coerce").abs()
+    return pd.to_numeric(_texto(columna).str.replace(r"[^\d.]", "", regex=True), errors="coerce")
+
+
+def limpiar_inventario(df, nombre_archivo):
+    """
+    Deja solo filas con Inventario numérico y las columnas de la plantilla ya normalizadas.
+    Trabaja columna por columna, sin recorrer las filas en Python.
+    """
+    # --- Categoría: la de cada fila si se reconoce (p. ej. una exportación con todas), si no la del archivo ---
+    por_archivo = validateCategory(nombre_archivo)
+    if "Categoría" not in df.columns:
+        df["Categoría"] = por_archivo
+    else:
+        ids = {valor: categoria_de_celda(valor) for valor in df["Categoría"].dropna().unique()}
+        df["Categoría"] = df["Categoría"].map(ids).fillna(por_archivo).astype(int)
+
+    # --- Limpieza ---
+    df = df[df["Inventario"].notna() & _texto(df["Inventario"]).str.isnumeric()].copy()
+
+    for col in ["Marca", "Descripción", "FUNCIONARIO QUE ENTREGA", "FUNCIONARIO QUE RECIBE"]:
+        df[col] = _texto(df[col])
+
+    if "Fecha Recibido" in df.columns:
+        df["Fecha Recibido"] = parsear_fechas(df["Fecha Recibido"]).fillna(FECHA_POR_DEFECTO).dt.strftime("%Y-%m-%d")
+
+    df["Valor"] = parsear_valores(df["Valor"]).fillna(0)
+
+    df = df[COLUMNAS_LIMPIAS]
+    df.columns = [normalize_key(c) for c in df.columns]
+    return df
+
+
+def en_lotes(registros, tamano):
+    """Agrupa un iterable en listas de a lo más `tamano` elementos"""
+    registros = iter(registros)
+    while True:
+        lote = list(islice(registros, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def _enteros_o_none(columna):
+    """Ids (Int64 con nulos) como lista de int de Python y None"""
+    return [None if pd.isna(v) else int(v) for v in columna.tolist()]
+
+
+def registros_para_carga(df, ubicaciones, not_found_ubicaciones):
+    """
+    Tuplas en el orden de carga.COLUMNAS_ITEMS para las filas de `df` (ya limpio y con los ids
+    de usuario). Resuelve cada ubicación distinta una vez con `ubicaciones`
+    (IndiceUbicaciones) y agrega a `not_found_ubicaciones` las que no existen; omite las
+    filas sin "recibido por".
+    """
+    # Ubicación: una resolución por valor distinto
+    ubicacion = df["ubicacion"].where(df["ubicacion"].map(type) == str)
+    ids_ubicacion = {}
+    for valor in ubicacion.dropna().unique():
+        if valor:
+            ids_ubicacion[valor] = ubicaciones.resolver(valor)
+            if not ids_ubicacion[valor]:
+                not_found_ubicaciones.add(valor.strip())
+    ubicacion_id = ubicacion.map(ids_ubicacion)
+
+    recibido = df["recibido_por_id"]
+    con_usuario = (recibido.notna() & (recibido.fillna(0) != 0)).to_numpy()  # el resto ya se reportó
+    if not con_usuario.any():
+        return []
+    df = df[con_usuario]
+
+    def sin_nulos(columna):
+        return columna.astype(object).where(columna.notna(), None).tolist()
+
+    return list(zip(
+        sin_nulos(df["inventario"]), sin_nulos(df["descripcion"]), sin_nulos(df["marca"]),
+        df["valor"].astype(float).tolist(), sin_nulos(df["fecha_recibido"]), df["categoria"].astype(int).tolist(),
+        _enteros_o_none(ubicacion_id[con_usuario]), _enteros_o_none(df["entregado_por_id"]),
+        _enteros_o_none(df["recibido_por_id"]), [0] * len(df),  # escuela_id
+    ))
+
+
+def procesar_importacion(archivo, nombre_archivo, user_id, progreso=None, tamano_lote=None, nombre_usuario=None):
+    """
+    Lee, limpia, resuelve y hace UPSERT de un archivo de inventario.
+
+    El archivo se procesa en lotes de `tamano_lote` filas (IMPORTACION_TAMANO_LOTE por
+    defecto) que se liberan después de escribirse, así la memoria no depende del largo de la
+    hoja. Cada lote se escribe en su propio savepoint: si falla se reporta en
+    `lotes_con_error` y el resto del archivo sigue. Si el archivo no corresponde al usuario
+    autenticado no se escribe nada.
+
+    Solo se escriben las filas nuevas o modificadas (ver carga.upsert_items); la respuesta
+    trae cuántas fueron nuevos, actualizados y sin_cambios.
+
+    Devuelve (respuesta, status_http); la respuesta trae en `metricas` los segundos por etapa
+    y cuántos funcionarios se resolvieron en cada nivel, que también quedan en el log.
+    `progreso(etapa, filas)`, si se pasa, recibe las filas acumuladas de cada etapa
+    (lectura, limpieza, usuarios, ubicaciones, escritura).
+    `nombre_usuario` es el nombre del usuario autenticado si la vista ya lo tiene
+    (login_required_api lo deja en request.user_data); si no, se consulta.
+    """
+    progreso = progreso or (lambda etapa, filas: None)
+    tamano_lote = tamano_lote or getattr(settings, "IMPORTACION_TAMANO_LOTE", 5000)
+
+    filas_por_etapa = defaultdict(int)
+    metricas = MetricasImportacion()
+
+    def avanzar(etapa, filas):
+        filas_por_etapa[etapa] += filas
+        progreso(etapa, filas_por_etapa[etapa])
+
+    # --- Lectura del archivo directo desde la hoja (sin pasar por CSV) ---
+    with metricas.etapa("lectura"):
+        columnas, registros = abrir_hoja(archivo, nombre_archivo)
+
+    not_found_ubicaciones, not_found_usuarios = set(), set()
+    cambios = {"nuevos": 0, "actualizados": 0, "sin_cambios": 0}
+    usuarios_recibidos_ids, usuarios_recibidos_nombres = set(), set()
+    lotes_con_error = []
+    procesados = 0
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # === VALIDACIÓN DE USUARIO AUTENTICADO ===
+            nombre_usuario_autenticado = nombre_usuario
+            if nombre_usuario_autenticado is None:
+                cursor.execute("SELECT nombre FROM usuarios WHERE id = %s", [user_id])
+                usuario_autenticado = cursor.fetchone()
+
+                if not usuario_autenticado:
+                    return (
+                        {"error": "Usuario no encontrado en la base de datos."},
+                        status.HTTP_400_BAD_REQUEST,
+                    )
+
+                nombre_usuario_autenticado = usuario_autenticado[0]
+
+            with metricas.etapa("cache_usuarios"):
+                usuario_cache = obtener_usuario_cache(cursor)
+
+                # === Índice de edificios y salones ===
+                ubicaciones = cargar_ubicaciones(cursor)
+
+            lotes = metricas.medir_iterable("lectura", en_lotes(registros, tamano_lote))
+            for numero, lote in enumerate(lotes, start=1):
+                # Filas de la hoja que abarca el lote, para que el usuario las ubique en el archivo
+                fila_inicial, fila_final = lote[0][0], lote[-1][0]
+                with metricas.etapa("lectura"):
+                    df = pd.DataFrame.from_records([registro for _, registro in lote], columns=columnas).fillna(np.nan)
+                del lote
+                avanzar("lectura", len(df))
+
+                with metricas.etapa("limpieza"):
+                    df = limpiar_inventario(df, nombre_archivo)
+                avanzar("limpieza", len(df))
+
+                # Resolver cada funcionario distinto una sola vez y llevar los IDs a las filas
+                with metricas.etapa("usuarios"):
+                    resueltos = usuario_cache.resolver_nombres(
+                        pd.concat([df["funcionario_que_entrega"], df["funcionario_que_recibe"]]).unique(),
+                        metricas=metricas,
+                    )
+                    df["entregado_por_id"] = df["funcionario_que_entrega"].map(resueltos).astype("Int64")
+                    df["recibido_por_id"] = df["funcionario_que_recibe"].map(resueltos).astype("Int64")
+                avanzar("usuarios", len(df))
+
+                # Validar que todos los registros tengan el mismo usuario en "recibido por"
+                # Usar IDs de usuario en lugar de nombres para la comparación
+                recibidos = df["recibido_por_id"].fillna(0)
+                usuarios_recibidos_ids.update(recibidos[recibidos != 0].unique().tolist())
+                usuarios_recibidos_nombres.update(
+                    df.loc[df["funcionario_que_recibe"] != "", "funcionario_que_recibe"].unique()
+                )
+
+                error = _validar_recibido_por(
+                    cursor, usuarios_recibidos_ids, usuarios_recibidos_nombres, user_id, nombre_usuario_autenticado
+                )
+                if error:
+                    # Deshace también los lotes ya escritos
+                    transaction.set_rollback(True)
+                    metricas.registrar("importacion_rechazada", archivo=nombre_archivo, usuario_id=user_id)
+                    return error
+
+                # Filas cuyo "recibido por" no existe: se reportan y no se insertan
+                sin_usuario = df["recibido_por_id"].fillna(0) == 0
+                not_found_usuarios.update(df.loc[sin_usuario, "funcionario_que_recibe"])
+                filas_lote = len(df)
+                with metricas.etapa("ubicaciones"):
+                    records = registros_para_carga(df, ubicaciones, not_found_ubicaciones)
+                    del df
+                avanzar("ubicaciones", filas_lote)
+
+                # === Batch UPSERT (COPY + tabla temporal para lotes grandes), un savepoint por lote ===
+                try:
+                    with metricas.etapa("escritura"), transaction.atomic():
+                        resumen = upsert_items(
+                            cursor, records, usuario_id=user_id, detalle=f"Importación de {nombre_archivo}"
+                        )
+                except (DatabaseError, psycopg2.Error) as e:
+                    lotes_con_error.append({
+                        "lote": numero,
+                        "filas": [fila_inicial, fila_final],
+                        "error": str(e).strip(),
+                    })
+                else:
+                    procesados += len(records)
+                    for clave in cambios:
+                        cambios[clave] += resumen[clave]
+                    avanzar("escritura", len(records))
+
+                del records
+
+    metricas.registrar(
+        "importacion", archivo=nombre_archivo, usuario_id=user_id, procesados=procesados,
+        lotes_con_error=len(lotes_con_error), **cambios,
+    )
+    return (
+        {
+            "status": "ok",
+            "procesados": procesados,
+            **cambios,
+            "ubicaciones_no_encontradas": list(not_found_ubicaciones),
+            "usuarios_no_encontrados": list(not_found_usuarios),
+            "lotes_con_error": lotes_con_error,
+            "metricas": metricas.resumen(),
+        },
+        status.HTTP_201_CREATED,
+    )
+
+
+# ================== VALIDACIÓN SIN ESCRIBIR (dry_run) ==================
+def _motivos_por_fila(df):
+    """
+    {índice: (motivos, advertencias)} mirando las celdas crudas con las mismas reglas que
+    limpiar_inventario. Motivos descartan la fila; advertencias son valores que se reemplazan.
+    """
+    inventario = _texto(df["Inventario"])
+    sin_inventario = df["Inventario"].isna()
+    no_numerico = ~sin_inventario & ~inventario.str.isnumeric()
+
+    valor_crudo = df["Valor"] if "Valor" in df.columns else pd.Series(np.nan, index=df.index)
+    valor = parsear_valores(valor_crudo)
+    valor_invalido = valor_crudo.notna() & valor.isna()
+
+    fecha_cruda = df["Fecha Recibido"] if "Fecha Recibido" in df.columns else pd.Series(np.nan, index=df.index)
+    fecha = parsear_fechas(fecha_cruda)
+    fecha_invalida = fecha_cruda.notna() & fecha.isna()
+
+    resultado = {}
+    for i, vacio, no_num, valor_mal, fecha_mal in zip(
+        df.index, sin_inventario, no_numerico, valor_invalido, fecha_invalida
+    ):
+        motivos, advertencias = [], []
+        if vacio:
+            motivos.append("inventario_vacio")
+        elif no_num:
+            motivos.append("inventario_no_numerico")
+        if valor_mal:
+            advertencias.append("valor_invalido")  # se importa como 0
+        if fecha_mal:
+            advertencias.append("fecha_invalida")  # se importa como 2000-01-01
+        resultado[i] = (motivos, advertencias)
+    return resultado
+
+
+def validar_importacion(archivo, nombre_archivo, user_id, nombre_usuario=None, tamano_lote=None):
+    """
+    Lectura, limpieza y resolución de usuarios y ubicaciones de procesar_importacion, sin
+    escribir nada ni abrir una transacción.
+
+    Devuelve (respuesta, status_http) con un reporte por fila: ids resueltos, nivel con el
+    que se encontró cada funcionario (directo, invertido, palabras o fuzzy con su score),
+    ubicación y los motivos por los que la fila se descartaría. `error_importacion` trae el
+    error que daría la importación real si el archivo no es del usuario autenticado.
+    """
+    tamano_lote = tamano_lote or getattr(settings, "IMPORTACION_TAMANO_LOTE", 5000)
+    columnas, registros = abrir_hoja(archivo, nombre_archivo)
+
+    with connection.cursor() as cursor:
+        if nombre_usuario is None:
+            cursor.execute("SELECT nombre FROM usuarios WHERE id = %s", [user_id])
+            fila_usuario = cursor.fetchone()
+            if not fila_usuario:
+                return {"error": "Usuario no encontrado en la base de datos."}, status.HTTP_400_BAD_REQUEST
+            nombre_usuario = fila_usuario[0]
+
+        usuario_cache = obtener_usuario_cache(cursor)
+        ubicaciones = cargar_ubicaciones(cursor)
+
+        reporte = []
+        recibidos_ids, recibidos_nombres = set(), set()
+        for lote in en_lotes(registros, tamano_lote):
+            # El índice es el número de fila en la hoja: es el que se informa en el reporte
+            numeros, lote = zip(*lote)
+            crudo = pd.DataFrame.from_records(list(lote), columns=columnas, index=list(numeros)).fillna(np.nan)
+            del lote
+
+            motivos = _motivos_por_fila(crudo)
+            df = limpiar_inventario(crudo.copy(), nombre_archivo)
+            detalle = usuario_cache.explicar_nombres(
+                pd.concat([df["funcionario_que_entrega"], df["funcionario_que_recibe"]]).unique()
+            )
+
+            limpias = df.to_dict(orient="index")
+            for fila, inventario in crudo["Inventario"].items():
+                motivos_fila, advertencias = motivos[fila]
+                entrada = {
+                    "fila": fila,
+                    "inventario": None if pd.isna(inventario) else str(inventario),
+                    "motivos": motivos_fila,
+                    "advertencias": advertencias,
+                }
+                limpia = limpias.get(fila)
+                if limpia is not None:
+                    ubicacion = limpia.get("ubicacion") if pd.notna(limpia.get("ubicacion")) else None
+                    detalle_ubicacion = ubicaciones.detalle(ubicacion)
+                    ubicacion_id = detalle_ubicacion["id"]
+                    entrada["entregado_por"] = {"nombre": limpia["funcionario_que_entrega"], **detalle[limpia["funcionario_que_entrega"]]}
+                    entrada["recibido_por"] = {"nombre": limpia["funcionario_que_recibe"], **detalle[limpia["funcionario_que_recibe"]]}
+                    entrada["ubicacion"] = {"nombre": ubicacion, **detalle_ubicacion}
+                    if ubicacion and not ubicacion_id:
+                        advertencias.append("ubicacion_no_encontrada")
+
+                    recibido_id = entrada["recibido_por"]["id"]
+                    if not recibido_id:
+                        motivos_fila.append("recibido_por_no_encontrado")
+                    else:
+                        recibidos_ids.add(recibido_id)
+                    if limpia["funcionario_que_recibe"] != "":
+                        recibidos_nombres.add(limpia["funcionario_que_recibe"])
+                entrada["estado"] = "descartada" if motivos_fila else "ok"
+                reporte.append(entrada)
+
+        error = _validar_recibido_por(cursor, recibidos_ids, recibidos_nombres, user_id, nombre_usuario)
+
+    validas = sum(1 for entrada in reporte if entrada["estado"] == "ok")
+    return (
+        {
+            "status": "dry_run",
+            "filas": len(reporte),
+            "validas": validas,
+            "descartadas": len(reporte) - validas,
+            "puede_importarse": error is None,
+            "error_importacion": error[0] if error else None,
+            "usuarios_no_encontrados": sorted({
+                e["recibido_por"]["nombre"] for e in reporte
+                if "recibido_por_no_encontrado" in e["motivos"]
+            }),
+            "ubicaciones_no_encontradas": sorted({
+                e["ubicacion"]["nombre"] for e in reporte if "ubicacion_no_encontrada" in e["advertencias"]
+            }),
+            "reporte": reporte,
+        },
+        status.HTTP_200_OK,
+    )
+
+
+def _validar_recibido_por(cursor, usuarios_recibidos_ids, usuarios_recibidos_nombres, user_id, nombre_usuario_autenticado):
+    """(respuesta, status_http) de error si el archivo no es del usuario autenticado; None si todo bien"""
+    # Verificar que solo haya un usuario único en "recibido por" (por ID)
+    if len(usuarios_recibidos_ids) > 1:
+        return (
+            {
+                "error": "Todos los registros deben tener el mismo usuario en la columna 'FUNCIONARIO QUE RECIBE'.",
+                "usuarios_encontrados": list(usuarios_recibidos_nombres)
+            },
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    # Verificar que el usuario en "recibido por" coincida con el usuario autenticado
+    if usuarios_recibidos_ids:
+        usuario_id_en_archivo = list(usuarios_recibidos_ids)[0]
+
+        if usuario_id_en_archivo != user_id:
+            # Obtener el nombre del usuario encontrado en el archivo para el mensaje de error
+            cursor.execute("SELECT nombre FROM usuarios WHERE id = %s", [usuario_id_en_archivo])
+            usuario_encontrado = cursor.fetchone()
+            nombre_usuario_encontrado = usuario_encontrado[0] if usuario_encontrado else "Usuario desconocido"
+
+            return (
+                {
+                    "error": f"El usuario en el archivo ('{nombre_usuario_encontrado}') no coincide con tu usuario autenticado ('{nombre_usuario_autenticado}').",
+                    "usuario_archivo": nombre_usuario_encontrado,
+                    "usuario_autenticado": nombre_usuario_autenticado
+                },
+                status.HTTP_403_FORBIDDEN,
+            )
+
+    return None
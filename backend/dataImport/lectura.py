@@ -0,0 +1,157 @@
+import csv
+import io
+import unicodedata
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import xlrd
+
+
+# ================== COLUMNAS DE LA PLANTILLA ==================
+COLUMNAS_PLANTILLA = [
+    "Inventario", "Descripción", "Marca", "Valor", "Fecha Recibido", "Categoría",
+    "Ubicación", "FUNCIONARIO QUE ENTREGA", "FUNCIONARIO QUE RECIBE",
+]
+
+# Columnas de texto: si la celda viene como número (p. ej. Inventario) se entrega como str
+COLUMNAS_TEXTO = {
+    "Inventario", "Descripción", "Marca", "Categoría", "Ubicación",
+    "FUNCIONARIO QUE ENTREGA", "FUNCIONARIO QUE RECIBE",
+}
+
+# Cuántas filas de preámbulo se revisan buscando los encabezados
+FILAS_MAXIMAS_PREAMBULO = 50
+
+# Textos que pandas.read_csv trataba como vacíos (el flujo anterior pasaba por CSV)
+VALORES_NULOS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+
+def _clave_columna(texto):
+    """Forma comparable de un encabezado: sin tildes, sin espacios extra y en minúsculas"""
+    texto = unicodedata.normalize("NFD", str(texto))
+    texto = texto.encode("ascii", "ignore").decode("utf-8")
+    return " ".join(texto.split()).lower()
+
+
+_COLUMNAS_POR_CLAVE = {_clave_columna(c): c for c in COLUMNAS_PLANTILLA}
+
+
+def _limpiar_celda(valor, texto=False):
+    """Normaliza el valor de una celda: strings recortados, floats enteros como int, vacíos a None"""
+    if isinstance(valor, str):
+        valor = valor.strip()
+        return None if valor in VALORES_NULOS else valor
+    if isinstance(valor, float):
+        if valor != valor:  # NaN
+            return None
+        if valor.is_integer():
+            valor = int(valor)
+    if texto and valor is not None:
+        return str(valor)
+    return valor
+
+
+def _detectar_encabezados(fila):
+    """{índice de columna: nombre de plantilla} si la fila parece la de encabezados"""
+    posiciones = {}
+    for i, valor in enumerate(fila):
+        if valor is None:
+            continue
+        nombre = _COLUMNAS_POR_CLAVE.get(_clave_columna(valor))
+        if nombre and nombre not in posiciones.values():
+            posiciones[i] = nombre
+    if "Inventario" in posiciones.values() and len(posiciones) >= 3:
+        return posiciones
+    return None
+
+
+# ================== LECTORES POR FORMATO ==================
+def _filas_xlsx(archivo):
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        for fila in libro.worksheets[0].iter_rows(values_only=True):
+            yield fila
+    finally:
+        libro.close()
+
+
+def _filas_xls(archivo):
+    # xlrd no puede leer .xls por partes: on_demand evita al menos cargar las otras hojas
+    libro = xlrd.open_workbook(file_contents=archivo.read(), on_demand=True)
+    try:
+        hoja = libro.sheet_by_index(0)
+        for i in range(hoja.nrows):
+            fila = []
+            for celda in hoja.row(i):
+                if celda.ctype == xlrd.XL_CELL_DATE:
+                    fila.append(xlrd.xldate_as_datetime(celda.value, libro.datemode))
+                elif celda.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                    fila.append(None)
+                else:
+                    fila.append(celda.value)
+            yield fila
+    finally:
+        libro.release_resources()
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(texto)
+    finally:
+        texto.detach()
+
+
+def _filas_crudas(archivo, nombre_archivo):
+    if nombre_archivo.endswith(".xlsx"):
+        return _filas_xlsx(archivo)
+    if nombre_archivo.endswith(".xls"):
+        return _filas_xls(archivo)
+    return _filas_csv(archivo)
+
+
+def abrir_hoja(archivo, nombre_archivo):
+    """
+    Ubica los encabezados y devuelve (columnas, registros) sin leer el resto de la hoja.
+
+    Salta el preámbulo hasta encontrar la fila que trae "Inventario" y otras columnas de la
+    plantilla. `registros` es un generador de (número de fila, dict) por fila de datos: el
+    número es el de la hoja, contando desde 1 como lo muestra Excel, y el dict tiene los
+    nombres de COLUMNAS_PLANTILLA como llaves. Las filas sin ningún dato se omiten. Solo se
+    mantiene en memoria la fila actual.
+    """
+    filas = _filas_crudas(archivo, nombre_archivo)
+
+    posiciones = None
+    encabezados = 0
+    for encabezados, fila in enumerate(filas, start=1):
+        posiciones = _detectar_encabezados(fila)
+        if posiciones or encabezados >= FILAS_MAXIMAS_PREAMBULO:
+            break
+
+    if not posiciones:
+        raise ValueError("No se encontró la fila de encabezados (columna 'Inventario') en el archivo.")
+
+    def registros():
+        ancho = max(posiciones) + 1
+        for numero, fila in enumerate(filas, start=encabezados + 1):
+            fila = list(fila[:ancho]) + [None] * (ancho - len(fila))
+            registro = {
+                nombre: _limpiar_celda(fila[i], texto=nombre in COLUMNAS_TEXTO)
+                for i, nombre in posiciones.items()
+            }
+            if any(valor is not None for valor in registro.values()):
+                yield numero, registro
+
+    return list(posiciones.values()), registros()
+
+
+def leer_dataframe(archivo, nombre_archivo):
+    """La hoja completa en un DataFrame con NaN en las celdas vacías, como lo dejaba read_csv"""
+    columnas, registros = abrir_hoja(archivo, nombre_archivo)
+    df = pd.DataFrame.from_records((registro for _, registro in registros), columns=columnas)
+    return df.fillna(np.nan)
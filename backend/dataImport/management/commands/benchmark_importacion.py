@@ -0,0 +1,58 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dataImport.benchmark import comparar, correr
+
+
+def _enteros(texto):
+    try:
+        return [int(valor) for valor in texto.split(",") if valor.strip()]
+    except ValueError:
+        raise CommandError(f"Se esperaba una lista de enteros separados por coma: '{texto}'")
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cada etapa de la importación (lectura, limpieza, usuarios por nivel, ubicaciones "
+        "y escritura) sobre libros sintéticos y guarda el resultado en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", default="1000,10000,100000", help="Tamaños de libro, separados por coma")
+        parser.add_argument("--usuarios", default="100,1000,10000", help="Tamaños de la tabla de usuarios")
+        parser.add_argument("--repeticiones", type=int, default=3)
+        parser.add_argument("--semilla", type=int, default=0)
+        parser.add_argument(
+            "--dsn", default=os.environ.get("BENCH_DATABASE_URL"),
+            help="Postgres local de pruebas (BENCH_DATABASE_URL); sin él se omite la escritura",
+        )
+        parser.add_argument("--salida", help="Archivo JSON del resultado (por defecto benchmark-<commit>.json)")
+        parser.add_argument("--comparar", help="JSON de una corrida anterior contra el que comparar")
+
+    def handle(self, *args, **opciones):
+        anterior = None
+        if opciones["comparar"]:
+            with open(opciones["comparar"], encoding="utf-8") as archivo:
+                anterior = json.load(archivo)
+
+        resultado = correr(
+            _enteros(opciones["filas"]),
+            _enteros(opciones["usuarios"]),
+            repeticiones=opciones["repeticiones"],
+            semilla=opciones["semilla"],
+            dsn=opciones["dsn"],
+            ruta_esquema=settings.BASE_DIR.parent / "db.sql",
+            avisar=self.stdout.write,
+        )
+
+        salida = opciones["salida"] or f"benchmark-{resultado['commit'] or 'local'}.json"
+        with open(salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Resultado guardado en {salida}"))
+
+        if anterior is not None:
+            for linea in comparar(anterior, resultado):
+                self.stdout.write(linea)
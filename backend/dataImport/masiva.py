@@ -0,0 +1,272 @@
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import psycopg2
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from rest_framework import status
+
+from .carga import upsert_items
+from .importacion import _validar_recibido_por, limpiar_inventario, registros_para_carga
+from .lectura import leer_dataframe
+from .metricas import MetricasImportacion
+from .ubicaciones import cargar_ubicaciones
+from .usuarios import obtener_usuario_cache
+
+
+# ================== IMPORTACIÓN DE VARIOS ARCHIVOS ==================
+# Cada archivo se lee y limpia en un proceso aparte (pandas/openpyxl no sueltan el GIL); los
+# nombres se resuelven una sola vez contra el cache de usuarios del proceso principal y las
+# filas de todos los archivos se escriben juntas en pocos UPSERT.
+EXTENSIONES_IMPORTABLES = (".xlsx", ".xls", ".csv")
+
+
+class ArchivoInvalido(ValueError):
+    """El lote no se puede importar tal como vino (ZIP dañado, demasiados archivos, etc.)"""
+
+
+def archivos_de_peticion(subidos):
+    """
+    [(nombre, bytes)] a partir de los archivos subidos; los .zip se abren y aportan cada hoja
+    que traen (se ignoran carpetas y archivos de otro tipo).
+    """
+    maximo = getattr(settings, "IMPORTACION_MAX_ARCHIVOS", 100)
+    maximo_bytes = getattr(settings, "IMPORTACION_MAX_BYTES_ZIP", 200 * 1024 * 1024)
+
+    archivos = []
+    for subido in subidos:
+        if not subido.name.lower().endswith(".zip"):
+            archivos.append((subido.name, subido.read()))
+            continue
+        try:
+            with zipfile.ZipFile(subido) as comprimido:
+                miembros = [
+                    m for m in comprimido.infolist()
+                    if not m.is_dir()
+                    and not m.filename.startswith("__MACOSX/")
+                    and m.filename.lower().endswith(EXTENSIONES_IMPORTABLES)
+                ]
+                if sum(m.file_size for m in miembros) > maximo_bytes:
+                    raise ArchivoInvalido(f"'{subido.name}' supera {maximo_bytes // (1024 * 1024)} MB descomprimido.")
+                for miembro in miembros:
+                    archivos.append((miembro.filename, comprimido.read(miembro)))
+        except zipfile.BadZipFile:
+            raise ArchivoInvalido(f"'{subido.name}' no es un ZIP válido.")
+
+    # El resultado va por nombre: dos archivos con el mismo nombre se distinguen con un sufijo
+    vistos = {}
+    for i, (nombre, contenido) in enumerate(archivos):
+        vistos[nombre] = vistos.get(nombre, 0) + 1
+        if vistos[nombre] > 1:
+            base, extension = os.path.splitext(nombre)
+            archivos[i] = (f"{base} ({vistos[nombre]}){extension}", contenido)
+
+    if not archivos:
+        raise ArchivoInvalido("No se encontró ningún archivo .xlsx, .xls o .csv para importar.")
+    if len(archivos) > maximo:
+        raise ArchivoInvalido(f"Se pueden importar hasta {maximo} archivos a la vez (llegaron {len(archivos)}).")
+    return archivos
+
+
+def leer_y_limpiar(nombre_archivo, contenido):
+    """Corre en el pool: (filas leídas, DataFrame limpio); ver limpiar_inventario para la categoría"""
+    df = leer_dataframe(io.BytesIO(contenido), nombre_archivo)
+    return len(df), limpiar_inventario(df, nombre_archivo)
+
+
+# ================== POOL DE PROCESOS ==================
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _procesos():
+    return getattr(settings, "IMPORTACION_PROCESOS", 0)
+
+
+def _obtener_pool():
+    """Pool compartido del proceso; spawn evita heredar hilos y conexiones del servidor"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_procesos(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _descartar_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def leer_archivos(archivos):
+    """
+    {nombre: (filas, df) o Exception} leyendo los archivos en paralelo. Con un solo archivo o
+    IMPORTACION_PROCESOS < 2 se leen en este proceso.
+    """
+    if len(archivos) < 2 or _procesos() < 2:
+        leidos = {}
+        for nombre, contenido in archivos:
+            try:
+                leidos[nombre] = leer_y_limpiar(nombre, contenido)
+            except Exception as e:
+                leidos[nombre] = e
+        return leidos
+
+    pool = _obtener_pool()
+    futuros = [(nombre, pool.submit(leer_y_limpiar, nombre, contenido)) for nombre, contenido in archivos]
+    leidos = {}
+    for nombre, futuro in futuros:
+        try:
+            leidos[nombre] = futuro.result()
+        except BrokenProcessPool as e:
+            _descartar_pool()  # un worker murió (p. ej. sin memoria): el próximo lote arma otro pool
+            leidos[nombre] = e
+        except Exception as e:
+            leidos[nombre] = e
+    return leidos
+
+
+# ================== ESCRITURA CONJUNTA ==================
+def grupos_de_escritura(pendientes, tamano):
+    """
+    Junta los registros de varios archivos en grupos de `tamano` filas (un archivo grande
+    puede repartirse en varios). Cada grupo es (registros, {nombre de archivo: filas}).
+    """
+    registros, por_archivo = [], {}
+    for nombre, records in pendientes:
+        inicio = 0
+        while inicio < len(records):
+            parte = records[inicio:inicio + tamano - len(registros)]
+            registros.extend(parte)
+            por_archivo[nombre] = por_archivo.get(nombre, 0) + len(parte)
+            inicio += len(parte)
+            if len(registros) >= tamano:
+                yield registros, por_archivo
+                registros, por_archivo = [], {}
+    if registros:
+        yield registros, por_archivo
+
+
+def procesar_importacion_multiple(archivos, user_id, nombre_usuario):
+    """
+    Importa varios archivos de un mismo usuario. Devuelve (respuesta, status_http) con el
+    resultado de cada archivo en `archivos`.
+
+    Cada archivo se valida por separado como en procesar_importacion (su categoría sale de la
+    columna Categoría o de validateCategory con su nombre, y todas sus filas deben ser
+    recibidas por el usuario autenticado); uno que no pase no impide importar los demás. Las filas de los archivos
+    válidos se escriben juntas en grupos de IMPORTACION_TAMANO_LOTE, cada uno en su
+    savepoint: si un grupo falla, el error se reporta en cada archivo que tenía filas en él.
+    Un archivo queda "ok" si se escribieron todas sus filas, "parcial" si solo algunas y
+    "error" si ninguna; la respuesta es 201 si al menos uno quedó "ok".
+    """
+    metricas = MetricasImportacion()
+    tamano = getattr(settings, "IMPORTACION_TAMANO_LOTE", 5000)
+
+    with metricas.etapa("lectura_y_limpieza"):
+        leidos = leer_archivos(archivos)
+
+    resultados = {}
+    for nombre, leido in leidos.items():
+        if isinstance(leido, Exception):
+            resultados[nombre] = {"archivo": nombre, "status": "error", "error": str(leido) or type(leido).__name__}
+        else:
+            resultados[nombre] = {"archivo": nombre, "filas": leido[0]}
+
+    cambios = {"nuevos": 0, "actualizados": 0, "sin_cambios": 0}
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            with metricas.etapa("cache_usuarios"):
+                usuario_cache = obtener_usuario_cache(cursor)
+                ubicaciones = cargar_ubicaciones(cursor)  # compartido: cada valor distinto se resuelve una vez
+
+            validos = {n: leido[1] for n, leido in leidos.items() if not isinstance(leido, Exception)}
+
+            # Un solo paso por el índice de usuarios para los nombres de todos los archivos
+            with metricas.etapa("usuarios"):
+                nombres = set()
+                for df in validos.values():
+                    nombres.update(df["funcionario_que_entrega"].unique())
+                    nombres.update(df["funcionario_que_recibe"].unique())
+                resueltos = usuario_cache.resolver_nombres(list(nombres), metricas=metricas)
+
+            pendientes = []
+            for nombre, df in validos.items():
+                resultado = resultados[nombre]
+                df["entregado_por_id"] = df["funcionario_que_entrega"].map(resueltos).astype("Int64")
+                df["recibido_por_id"] = df["funcionario_que_recibe"].map(resueltos).astype("Int64")
+
+                recibidos = df["recibido_por_id"].fillna(0)
+                error = _validar_recibido_por(
+                    cursor,
+                    set(recibidos[recibidos != 0].unique().tolist()),
+                    set(df.loc[df["funcionario_que_recibe"] != "", "funcionario_que_recibe"].unique()),
+                    user_id,
+                    nombre_usuario,
+                )
+                if error:
+                    resultado.update(status="error", **error[0])
+                    continue
+
+                sin_usuario = recibidos == 0
+                no_encontradas = set()
+                with metricas.etapa("ubicaciones"):
+                    records = registros_para_carga(df, ubicaciones, no_encontradas)
+                resultado.update(
+                    status="ok",
+                    categoria=int(df["categoria"].iloc[0]) if len(df) else None,
+                    procesados=0,
+                    usuarios_no_encontrados=sorted(set(df.loc[sin_usuario, "funcionario_que_recibe"])),
+                    ubicaciones_no_encontradas=sorted(no_encontradas),
+                    lotes_con_error=[],
+                )
+                pendientes.append((nombre, records))
+            del validos
+
+            for numero, (records, por_archivo) in enumerate(grupos_de_escritura(pendientes, tamano), start=1):
+                try:
+                    with metricas.etapa("escritura"), transaction.atomic():
+                        resumen = upsert_items(
+                            cursor, records, usuario_id=user_id, detalle=f"Importación de {', '.join(por_archivo)}"
+                        )
+                except (DatabaseError, psycopg2.Error) as e:
+                    for nombre in por_archivo:
+                        resultados[nombre]["lotes_con_error"].append({"lote": numero, "error": str(e).strip()})
+                    continue
+                for nombre, filas in por_archivo.items():
+                    resultados[nombre]["procesados"] += filas
+                for clave in cambios:
+                    cambios[clave] += resumen[clave]
+
+    # Un archivo es "ok" solo si se escribieron todas sus filas
+    for nombre, records in pendientes:
+        resultado = resultados[nombre]
+        if records and resultado["procesados"] == 0:
+            resultado.update(status="error", error="No se pudo escribir ninguna fila (ver lotes_con_error).")
+        elif resultado["procesados"] < len(records):
+            resultado["status"] = "parcial"
+
+    importados = [r for r in resultados.values() if r["status"] == "ok"]
+    procesados = sum(r.get("procesados", 0) for r in resultados.values())
+    metricas.registrar(
+        "importacion_multiple", usuario_id=user_id, archivos=len(archivos),
+        importados=len(importados), procesados=procesados, **cambios,
+    )
+    return (
+        {
+            "status": "ok" if importados else "error",
+            "archivos": [resultados[nombre] for nombre, _ in archivos if nombre in resultados],
+            "procesados": procesados,
+            **cambios,
+            "metricas": metricas.resumen(),
+        },
+        status.HTTP_201_CREATED if importados else status.HTTP_400_BAD_REQUEST,
+    )
+
@@ -0,0 +1,60 @@
+import contextlib
+import json
+import logging
+import time
+from collections import defaultdict
+
+
+logger = logging.getLogger(__name__)
+
+_FIN = object()
+
+# Niveles de resolución de usuarios, en el orden en que se prueban
+NIVELES_USUARIO = ["memo", "directo", "invertido", "palabras", "fuzzy", "no_encontrado", "vacio"]
+
+
+# ================== MÉTRICAS DE UNA IMPORTACIÓN ==================
+class MetricasImportacion:
+    """
+    Tiempos por etapa y aciertos por nivel de resolución de usuarios de una importación.
+    resumen() es lo que se adjunta a la respuesta; registrar() lo deja en el log.
+    """
+
+    def __init__(self):
+        self.segundos = defaultdict(float)
+        self.niveles = defaultdict(int)
+        self._inicio = time.perf_counter()
+
+    @contextlib.contextmanager
+    def etapa(self, nombre):
+        """Suma a `nombre` el tiempo del bloque; una etapa puede medirse en varios lotes"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.segundos[nombre] += time.perf_counter() - inicio
+
+    def medir_iterable(self, nombre, iterable):
+        """Recorre `iterable` sumando a `nombre` lo que tarda cada elemento en llegar (p. ej. leer la hoja)"""
+        iterador = iter(iterable)
+        while True:
+            with self.etapa(nombre):
+                elemento = next(iterador, _FIN)
+            if elemento is _FIN:
+                return
+            yield elemento
+
+    def contar(self, nivel, cantidad=1):
+        self.niveles[nivel] += cantidad
+
+    def resumen(self):
+        return {
+            "segundos": {etapa: round(s, 4) for etapa, s in self.segundos.items()},
+            "total_segundos": round(time.perf_counter() - self._inicio, 4),
+            "usuarios_por_nivel": {nivel: self.niveles[nivel] for nivel in NIVELES_USUARIO if self.niveles[nivel]},
+        }
+
+    def registrar(self, evento, **datos):
+        """Una línea INFO con el resumen en JSON; los campos también van en `extra` para handlers estructurados"""
+        registro = {"evento": evento, **datos, **self.resumen()}
+        logger.info("%s", json.dumps(registro, ensure_ascii=False, default=str), extra={"metricas": registro})
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+
+# Los modelos de la app no son gestionados: las tablas vienen de db.sql y estos índices se
+# agregan a mano. CONCURRENTLY no bloquea escrituras mientras se construye el índice, pero no
+# puede correr dentro de una transacción, por eso la migración no es atómica.
+
+def _indice_unico_inventario_existe(cursor):
+    cursor.execute("""
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = 'public.inventario_items'::regclass
+          AND i.indisunique AND i.indisvalid AND i.indnatts = 1 AND i.indpred IS NULL
+          AND a.attname = 'inventario'
+    """)
+    return cursor.fetchone() is not None
+
+
+def crear_indice_unico_inventario(apps, schema_editor):
+    """ON CONFLICT (inventario) de la carga necesita un índice único sobre la columna"""
+    with schema_editor.connection.cursor() as cursor:
+        if _indice_unico_inventario_existe(cursor):
+            return
+        cursor.execute("""
+            SELECT inventario, COUNT(*)
+            FROM inventario_items
+            GROUP BY inventario
+            HAVING COUNT(*) > 1
+            ORDER BY COUNT(*) DESC
+            LIMIT 10
+        """)
+        repetidos = cursor.fetchall()
+        if repetidos:
+            ejemplos = ", ".join(f"{inventario} ({veces})" for inventario, veces in repetidos)
+            raise RuntimeError(
+                "inventario_items tiene números de inventario repetidos; hay que unificarlos antes "
+                f"de crear el índice único. Algunos: {ejemplos}"
+            )
+        # Un intento anterior fallido deja el índice marcado como inválido
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_inventario_items_inventario_unico")
+        cursor.execute("""
+            CREATE UNIQUE INDEX CONCURRENTLY idx_inventario_items_inventario_unico
+            ON public.inventario_items (inventario)
+        """)
+
+
+def quitar_indice_unico_inventario(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_inventario_items_inventario_unico")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('dataImport', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            crear_indice_unico_inventario,
+            quitar_indice_unico_inventario,
+        ),
+        # El índice simple queda de más: el único sirve para las mismas búsquedas
+        migrations.RunSQL(
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_inventario_items_inventario",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventario_items_inventario ON public.inventario_items (inventario)",
+        ),
+        # Listado, resumen y exportación filtran por recibido_por_id y ordenan por fecha
+        migrations.RunSQL(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventario_items_recibido_fecha
+            ON public.inventario_items (recibido_por_id, fecha_recibido DESC, id DESC)
+            """,
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_inventario_items_recibido_fecha",
+        ),
+        # login_view y register_view buscan por código
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_usuarios_codigo ON public.usuarios (codigo)",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_usuarios_codigo",
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+# Búsqueda y paginación del listado de usuarios (accounts.consultas). La columna generada usa
+# normalizar_busqueda(), la misma función de la búsqueda de inventario en db.sql; se vuelve a
+# declarar por si la base es anterior a esa búsqueda. Como en 0002, los índices se crean
+# CONCURRENTLY y por eso la migración no es atómica.
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('dataImport', '0002_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE EXTENSION IF NOT EXISTS unaccent;
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            CREATE OR REPLACE FUNCTION public.normalizar_busqueda(texto TEXT) RETURNS TEXT
+              LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+              AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, texto)) $$;
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            """
+            ALTER TABLE public.usuarios
+              ADD COLUMN IF NOT EXISTS nombre_busqueda TEXT GENERATED ALWAYS AS (
+                ' ' || public.normalizar_busqueda(nombre)
+              ) STORED
+            """,
+            "ALTER TABLE public.usuarios DROP COLUMN IF EXISTS nombre_busqueda",
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_usuarios_nombre ON public.usuarios (nombre, id)",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_usuarios_nombre",
+        ),
+        migrations.RunSQL(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_usuarios_nombre_busqueda
+            ON public.usuarios USING GIN (nombre_busqueda gin_trgm_ops)
+            """,
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_usuarios_nombre_busqueda",
+        ),
+    ]
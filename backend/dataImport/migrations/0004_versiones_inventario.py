@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+# Contador por usuario para el ETag del listado de inventario (consultas.version_inventario);
+# lo incrementa carga.upsert_items. Reemplaza a COUNT(*) + MAX(fecha) de la trazabilidad.
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataImport', '0003_busqueda_usuarios'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE TABLE IF NOT EXISTS public.inventario_versiones (
+              usuario_id INTEGER PRIMARY KEY REFERENCES public.usuarios(id) ON UPDATE CASCADE ON DELETE CASCADE,
+              version    BIGINT NOT NULL DEFAULT 0
+            )
+            """,
+            "DROP TABLE IF EXISTS public.inventario_versiones",
+        ),
+    ]
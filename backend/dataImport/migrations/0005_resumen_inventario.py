@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+# Resumen por escuela, categoría, ubicación y mes (dataImport.resumen); carga.upsert_items le
+# aplica el delta de cada fila escrita. La carga inicial es la misma de db.sql y solo corre si
+# el resumen está vacío, así no duplica lo que ya haya en una base creada desde db.sql.
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataImport', '0004_versiones_inventario'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE TABLE IF NOT EXISTS public.inventario_resumen (
+              escuela_id   INTEGER,
+              categoria_id INTEGER,
+              ubicacion_id INTEGER,
+              mes          DATE,
+              items        BIGINT  NOT NULL DEFAULT 0,
+              valor        NUMERIC NOT NULL DEFAULT 0,
+              CONSTRAINT inventario_resumen_clave
+                UNIQUE NULLS NOT DISTINCT (escuela_id, categoria_id, ubicacion_id, mes)
+            )
+            """,
+            "DROP TABLE IF EXISTS public.inventario_resumen",
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO public.inventario_resumen (escuela_id, categoria_id, ubicacion_id, mes, items, valor)
+            SELECT escuela_id, categoria_id, ubicacion_id, date_trunc('month', fecha_recibido)::date,
+                   COUNT(*), COALESCE(SUM(valor), 0)
+            FROM public.inventario_items
+            WHERE NOT EXISTS (SELECT 1 FROM public.inventario_resumen)
+            GROUP BY 1, 2, 3, 4
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
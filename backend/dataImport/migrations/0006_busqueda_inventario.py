@@ -0,0 +1,64 @@
+from django.db import migrations
+
+
+# Búsqueda de inventario (consultas.construir_consulta_busqueda): columnas generadas con el
+# texto normalizado y sus índices GIN. La extensión y normalizar_busqueda() ya las declara 0003;
+# se repiten para que esta migración no dependa de lo que haga aquella. Como en 0002, los
+# índices se crean CONCURRENTLY y por eso la migración no es atómica.
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('dataImport', '0005_resumen_inventario'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE EXTENSION IF NOT EXISTS unaccent;
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            CREATE OR REPLACE FUNCTION public.normalizar_busqueda(texto TEXT) RETURNS TEXT
+              LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+              AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, texto)) $$;
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            """
+            ALTER TABLE public.inventario_items
+              ADD COLUMN IF NOT EXISTS busqueda TSVECTOR GENERATED ALWAYS AS (
+                setweight(to_tsvector('spanish', public.normalizar_busqueda(coalesce(inventario, ''))), 'A') ||
+                setweight(to_tsvector('spanish', public.normalizar_busqueda(coalesce(descripcion, ''))), 'B') ||
+                setweight(to_tsvector('spanish', public.normalizar_busqueda(coalesce(marca, ''))), 'C')
+              ) STORED
+            """,
+            "ALTER TABLE public.inventario_items DROP COLUMN IF EXISTS busqueda",
+        ),
+        migrations.RunSQL(
+            """
+            ALTER TABLE public.inventario_items
+              ADD COLUMN IF NOT EXISTS busqueda_texto TEXT GENERATED ALWAYS AS (
+                public.normalizar_busqueda(
+                  coalesce(inventario, '') || ' ' || coalesce(descripcion, '') || ' ' || coalesce(marca, '')
+                )
+              ) STORED
+            """,
+            "ALTER TABLE public.inventario_items DROP COLUMN IF EXISTS busqueda_texto",
+        ),
+        migrations.RunSQL(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventario_items_busqueda
+            ON public.inventario_items USING GIN (busqueda)
+            """,
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_inventario_items_busqueda",
+        ),
+        migrations.RunSQL(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventario_items_busqueda_trgm
+            ON public.inventario_items USING GIN (busqueda_texto gin_trgm_ops)
+            """,
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_inventario_items_busqueda_trgm",
+        ),
+    ]
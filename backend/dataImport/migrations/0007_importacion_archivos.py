@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+# Huellas de los archivos importados con éxito (dataImport.huellas): subir el mismo archivo
+# otra vez devuelve el resultado guardado, salvo force=1.
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataImport', '0006_busqueda_inventario'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE TABLE IF NOT EXISTS public.importacion_archivos (
+              usuario_id   INTEGER NOT NULL REFERENCES public.usuarios(id) ON UPDATE CASCADE ON DELETE CASCADE,
+              huella       CHAR(64) NOT NULL,   -- sha256 del contenido
+              categoria_id INTEGER NOT NULL,    -- validateCategory(nombre del archivo)
+              archivo      TEXT,
+              resultado    JSONB,
+              status_http  INTEGER,
+              importado    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+              PRIMARY KEY (usuario_id, huella, categoria_id)
+            )
+            """,
+            "DROP TABLE IF EXISTS public.importacion_archivos",
+        ),
+    ]
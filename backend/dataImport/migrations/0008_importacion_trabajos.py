@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+# Estado de las importaciones en segundo plano (dataImport.tareas), visible desde cualquier
+# worker. tareas._purgar_trabajos borra los terminados pasada la retención.
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataImport', '0007_importacion_archivos'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE TABLE IF NOT EXISTS public.importacion_trabajos (
+              id              VARCHAR(32) PRIMARY KEY,
+              usuario_id      INTEGER REFERENCES public.usuarios(id) ON UPDATE CASCADE ON DELETE CASCADE,
+              archivo         TEXT,
+              estado          TEXT NOT NULL,   -- en_cola, procesando, terminado, error
+              etapa           TEXT,
+              filas_por_etapa JSONB,
+              resultado       JSONB,
+              status_http     INTEGER,
+              creado          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+              terminado       TIMESTAMPTZ
+            )
+            """,
+            "DROP TABLE IF EXISTS public.importacion_trabajos",
+        ),
+    ]
@@ -0,0 +1,166 @@
+import datetime
+from decimal import Decimal, InvalidOperation
+
+from .consultas import ParametroInvalido, parsear_filtros
+
+
+# ================== RESUMEN DE INVENTARIO ==================
+# inventario_resumen guarda items y valor total por (escuela, categoría, ubicación, mes de
+# fecha_recibido). carga.upsert_items le aplica el delta de cada fila que escribe, así las
+# consultas agregadas no recorren inventario_items.
+
+
+def _id(valor):
+    return None if valor is None else int(valor)
+
+
+def _mes(fecha):
+    """Primer día del mes como 'AAAA-MM-01' (fecha_recibido llega como str o date)"""
+    if fecha is None:
+        return None
+    return f"{str(fecha)[:7]}-01"
+
+
+def _valor(valor):
+    if valor is None:
+        return Decimal(0)
+    try:
+        return Decimal(str(valor))
+    except InvalidOperation:
+        return Decimal(0)
+
+
+def clave_resumen(fila):
+    """Clave del resumen para una fila de inventario_items ({columna: valor})"""
+    return (_id(fila["escuela_id"]), _id(fila["categoria_id"]), _id(fila["ubicacion_id"]), _mes(fila["fecha_recibido"]))
+
+
+def acumular_delta(deltas, anterior, nuevo):
+    """
+    Suma en `deltas` ({clave: (items, valor)}) el efecto de pasar una fila de `anterior` a
+    `nuevo`. Ambos son {columna: valor}; `anterior` None es un alta.
+    """
+    for fila, signo in ((anterior, -1), (nuevo, 1)):
+        if fila is None:
+            continue
+        clave = clave_resumen(fila)
+        items, valor = deltas.get(clave, (0, Decimal(0)))
+        deltas[clave] = (items + signo, valor + signo * _valor(fila["valor"]))
+
+
+def aplicar_deltas(cursor, deltas):
+    """Aplica `deltas` a inventario_resumen en un solo INSERT ... ON CONFLICT"""
+    filas = [clave + delta for clave, delta in deltas.items() if delta[0] or delta[1]]
+    if not filas:
+        return
+    # Orden fijo: dos importaciones simultáneas bloquean las filas del resumen en el mismo orden
+    filas.sort(key=lambda fila: [(v is None, str(v)) for v in fila[:4]])
+    cursor.execute("""
+        INSERT INTO inventario_resumen (escuela_id, categoria_id, ubicacion_id, mes, items, valor)
+        SELECT * FROM unnest(%s::integer[], %s::integer[], %s::integer[], %s::date[], %s::bigint[], %s::numeric[])
+        ON CONFLICT (escuela_id, categoria_id, ubicacion_id, mes) DO UPDATE SET
+            items = inventario_resumen.items + EXCLUDED.items,
+            valor = inventario_resumen.valor + EXCLUDED.valor
+    """, [list(columna) for columna in zip(*filas)])
+
+
+# ================== CONSULTA DEL RESUMEN ==================
+# dimensión -> (columna del resumen, nombre legible, JOIN que lo trae)
+DIMENSIONES_RESUMEN = {
+    "escuela": ("r.escuela_id", "esc.nombre", "LEFT JOIN escuelas esc ON r.escuela_id = esc.id"),
+    "categoria": ("r.categoria_id", "c.nombre", "LEFT JOIN categorias c ON r.categoria_id = c.id"),
+    "ubicacion": ("r.ubicacion_id", "e.edificio", "LEFT JOIN edificios e ON r.ubicacion_id = e.id"),
+    "mes": ("r.mes", None, None),
+}
+
+
+def parsear_dimensiones(texto):
+    """`por=categoria,mes` -> dimensiones de agrupación; vacío = categoría"""
+    if not texto:
+        return ["categoria"]
+    dimensiones = [d.strip() for d in texto.split(",") if d.strip()]
+    desconocidas = [d for d in dimensiones if d not in DIMENSIONES_RESUMEN]
+    if desconocidas:
+        raise ParametroInvalido(f"Dimensiones desconocidas: {', '.join(desconocidas)}")
+    return dimensiones or ["categoria"]
+
+
+def parsear_filtros_resumen(params):
+    """Los filtros del listado (categoria, edificio, desde, hasta) más escuela"""
+    filtros = parsear_filtros(params)
+    if params.get("escuela"):
+        try:
+            filtros["escuela"] = int(params["escuela"])
+        except ValueError:
+            raise ParametroInvalido("'escuela' debe ser un número entero")
+    return filtros
+
+
+# Roles que ven el resumen de todas las escuelas; el resto solo el de la suya
+ROLES_RESUMEN_COMPLETO = ("admin", "director")
+
+
+class ResumenNoPermitido(PermissionError):
+    """El usuario pidió el resumen de una escuela que no es la suya; las vistas lo devuelven como 403"""
+
+
+def limitar_a_escuela(cursor, user_id, rol, filtros):
+    """
+    `filtros` con la escuela que el usuario puede ver: admin y director cualquiera (o todas),
+    el resto solo la propia. Un usuario sin escuela no ve ningún resumen.
+    """
+    if rol in ROLES_RESUMEN_COMPLETO:
+        return filtros
+    cursor.execute("SELECT escuela_id FROM usuarios WHERE id = %s", [user_id])
+    fila = cursor.fetchone()
+    escuela = fila[0] if fila else None
+    if escuela is None:
+        raise ResumenNoPermitido("Tu usuario no tiene una escuela asignada.")
+    if filtros.get("escuela", escuela) != escuela:
+        raise ResumenNoPermitido("Solo puedes ver el resumen de tu escuela.")
+    return {**filtros, "escuela": escuela}
+
+
+def consultar_resumen(cursor, dimensiones, filtros):
+    """Filas agregadas por `dimensiones`: ids, nombres, items y valor"""
+    columnas, nombres, joins, agrupar = [], [], [], []
+    for dimension in dimensiones:
+        columna, nombre, join = DIMENSIONES_RESUMEN[dimension]
+        columnas.append(f"{columna} AS {dimension}_id" if nombre else f"{columna} AS {dimension}")
+        agrupar.append(columna)
+        nombres.append(f"{dimension}_id" if nombre else dimension)
+        if nombre:
+            columnas.append(f"{nombre} AS {dimension}")
+            agrupar.append(nombre)
+            nombres.append(dimension)
+            joins.append(join)
+
+    condiciones, params = ["TRUE"], []
+    for filtro, condicion in [
+        ("escuela", "r.escuela_id = %s"),
+        ("categoria", "r.categoria_id = %s"),
+        ("edificio", "r.ubicacion_id = %s"),
+        ("desde", "r.mes >= date_trunc('month', %s::date)"),
+        ("hasta", "r.mes <= %s"),
+    ]:
+        if filtro in filtros:
+            condiciones.append(condicion)
+            params.append(filtros[filtro])
+
+    cursor.execute(f"""
+        SELECT {", ".join(columnas + ["SUM(r.items) AS items", "SUM(r.valor) AS valor"])}
+        FROM inventario_resumen r
+        {" ".join(joins)}
+        WHERE {" AND ".join(condiciones)}
+        GROUP BY {", ".join(agrupar)}
+        HAVING SUM(r.items) <> 0
+        ORDER BY {", ".join(agrupar)}
+    """, params)
+
+    filas = []
+    for fila in cursor.fetchall():
+        fila = dict(zip(nombres + ["items", "valor"], fila))
+        if isinstance(fila.get("mes"), datetime.date):
+            fila["mes"] = fila["mes"].isoformat()[:7]
+        filas.append(fila)
+    return filas
@@ -0,0 +1,126 @@
+import datetime
+import random
+
+from openpyxl import Workbook
+
+
+# ================== DATOS SINTÉTICOS PARA BENCHMARKS ==================
+NOMBRES = [
+    "Juan", "José", "Luis", "Carlos", "Andrés", "María", "Ana", "Lucía", "Sofía", "Camila",
+    "Jesús", "Ramón", "Ángel", "Julián", "Martín", "Valentina", "Daniela", "Mónica", "Inés", "Rocío",
+    "Sebastián", "Nicolás", "Felipe", "Gabriel", "Óscar", "Paula", "Natalia", "Verónica", "Adrián", "Tomás",
+]
+APELLIDOS = [
+    "Pernalete", "Maldonado", "Gómez", "Flórez", "Rodríguez", "Martínez", "Pérez", "Sánchez", "Ramírez",
+    "Díaz", "Hernández", "López", "García", "Muñoz", "Jiménez", "Álvarez", "Ruiz", "Castaño", "Ortíz",
+    "Rincón", "Peña", "Suárez", "Cárdenas", "Valencia", "Ibáñez", "Londoño", "Quiñónez", "Zúñiga", "Bermúdez",
+    "Agudelo", "Arango", "Cortés", "Echeverri", "Galeano", "Henao", "Restrepo", "Saldarriaga", "Uribe",
+]
+DESCRIPCIONES = [
+    "SILLA CON BRAZO TIPO TONY", "MESA DE COMPUTO", "COMPUTADOR DE ESCRITORIO", "ARCHIVADOR METALICO",
+    "VIDEO PROYECTOR", "TABLERO ACRILICO", "ESCRITORIO EN MADERA", "IMPRESORA LASER", "AIRE ACONDICIONADO",
+]
+MARCAS = ["TONY", "HP", "LENOVO", "EPSON", "SAMSUNG", "LG", "", "GENERICO"]
+EDIFICIOS = [
+    "LABORATORIOS LIVIANOS", "BLOQUE ADMINISTRATIVO", "BIBLIOTECA CENTRAL", "AUDITORIO PRINCIPAL",
+    "LABORATORIOS PESADOS", "BIENESTAR UNIVERSITARIO", "BLOQUE DE AULAS 1", "BLOQUE DE AULAS 2",
+]
+
+# Columnas en la posición en que vienen en los archivos del sistema financiero (fila 8)
+COLUMNAS_ARCHIVO = {
+    1: "Inventario", 3: "Descripción", 5: "Marca", 8: "Valor", 9: "Fecha Recibido",
+    11: "Ubicación", 12: "FUNCIONARIO QUE RECIBE", 14: "FUNCIONARIO QUE ENTREGA",
+}
+
+
+def generar_usuarios(cantidad, semilla=0):
+    """`cantidad` nombres completos distintos, con tildes, de 2 a 4 partes"""
+    rng = random.Random(semilla)
+    nombres = set()
+    while len(nombres) < cantidad:
+        partes = [rng.choice(NOMBRES)]
+        if rng.random() < 0.6:
+            partes.append(rng.choice(NOMBRES))
+        partes.append(rng.choice(APELLIDOS))
+        if rng.random() < 0.8:
+            partes.append(rng.choice(APELLIDOS))
+        nombres.add(" ".join(partes))
+    return sorted(nombres)
+
+
+def ruido(nombre, rng):
+    """Una variante de `nombre` como las que llegan en los archivos; a veces el nombre tal cual"""
+    tipo = rng.random()
+    if tipo < 0.4:
+        return nombre.upper()
+    if tipo < 0.6:
+        # Sin tildes, en mayúsculas (como lo exporta el sistema financiero)
+        return nombre.upper().translate(str.maketrans("ÁÉÍÓÚÑ", "AEIOUN"))
+    if tipo < 0.75:
+        # Error de tipeo: una letra de menos en alguna parte larga
+        partes = nombre.upper().split()
+        i = rng.randrange(len(partes))
+        if len(partes[i]) > 5:
+            j = rng.randrange(1, len(partes[i]) - 1)
+            partes[i] = partes[i][:j] + partes[i][j + 1:]
+        return " ".join(partes)
+    if tipo < 0.85:
+        # Apellidos primero
+        partes = nombre.upper().split()
+        return " ".join(partes[len(partes) // 2:] + partes[:len(partes) // 2])
+    return f"  {nombre}  "
+
+
+def ruido_ubicacion(edificio, rng):
+    """El edificio tal cual casi siempre; a veces en minúsculas o con una letra de menos"""
+    tipo = rng.random()
+    if tipo < 0.7:
+        return edificio + " " * rng.randrange(0, 10)
+    if tipo < 0.85:
+        return edificio.lower()
+    i = rng.randrange(1, len(edificio) - 1)
+    return edificio[:i] + edificio[i + 1:]
+
+
+def filas_inventario(filas, usuarios, recibe, semilla=0, inicio=100000):
+    """Filas de datos: todas recibidas por `recibe` (con ruido) y entregadas por usuarios al azar"""
+    rng = random.Random(semilla)
+    fecha_base = datetime.datetime(2020, 1, 1)
+    for i in range(filas):
+        yield {
+            "Inventario": inicio + i,
+            "Descripción": rng.choice(DESCRIPCIONES) + " " * rng.randrange(0, 40),
+            "Marca": rng.choice(MARCAS),
+            "Valor": round(rng.uniform(10000, 5000000), -2),
+            "Fecha Recibido": fecha_base + datetime.timedelta(days=rng.randrange(0, 1800)),
+            "Ubicación": ruido_ubicacion(rng.choice(EDIFICIOS), rng),
+            "FUNCIONARIO QUE RECIBE": ruido(recibe, rng),
+            "FUNCIONARIO QUE ENTREGA": ruido(rng.choice(usuarios), rng),
+        }
+
+
+def escribir_libro(archivo, filas, usuarios, recibe, semilla=0, titulo="Elementos Menores"):
+    """
+    Escribe un .xlsx con la forma de los archivos reales: 7 filas de preámbulo, encabezados en
+    la fila 8 en columnas salteadas, una fila " UAA:" debajo y luego los datos.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("listaCompraProveedores")
+    ancho = max(COLUMNAS_ARCHIVO) + 1
+
+    for texto in ["Sistema de Información Financiero", "Consulta Inventarios", None, titulo, None, None, None]:
+        hoja.append([None, None, None, None, texto])
+
+    encabezados = [None] * ancho
+    for columna, nombre in COLUMNAS_ARCHIVO.items():
+        encabezados[columna] = nombre
+    hoja.append(encabezados)
+    hoja.append([None, " UAA:", None, "3180 - DIVISION DE GESTION DE TALENTO HUMANO"])
+
+    for registro in filas_inventario(filas, usuarios, recibe, semilla):
+        fila = [None] * ancho
+        for columna, nombre in COLUMNAS_ARCHIVO.items():
+            fila[columna] = registro[nombre]
+        hoja.append(fila)
+
+    libro.save(archivo)
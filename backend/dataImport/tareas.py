@@ -0,0 +1,197 @@
+import datetime
+import io
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DatabaseError, connection, connections
+from rest_framework import status
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+# ================== IMPORTACIONES EN SEGUNDO PLANO ==================
+# Los trabajos corren en el proceso que recibió el archivo y su avance vive en memoria. El
+# estado (en cola, procesando, resultado final) también se guarda en importacion_trabajos
+# para que cualquier worker del servidor pueda responder por él; las filas de trabajos
+# terminados hace más de IMPORTACION_TRABAJOS_RETENCION_DIAS se borran al registrar uno nuevo.
+TRABAJOS_RETENCION_SEGUNDOS = 3600
+
+
+class TrabajoImportacion:
+    def __init__(self, usuario_id, nombre_archivo, nombre_usuario=None, huella=None):
+        self.id = uuid.uuid4().hex
+        self.usuario_id = usuario_id
+        self.nombre_usuario = nombre_usuario
+        self.huella = huella  # sha256 del archivo (dataImport.huellas)
+        self.nombre_archivo = nombre_archivo
+        self.estado = "en_cola"  # en_cola -> procesando -> terminado | error
+        self.etapa = None
+        self.filas_por_etapa = {}
+        self.resultado = None
+        self.status_http = None
+        self.creado = time.time()
+        self.terminado = None
+
+    def avanzar(self, etapa, filas):
+        self.etapa = etapa
+        self.filas_por_etapa[etapa] = filas
+
+    @classmethod
+    def desde_fila(cls, fila):
+        """Trabajo de otro proceso, leído de importacion_trabajos (sin el avance en vivo)"""
+        trabajo_id, usuario_id, archivo, estado, etapa, filas_por_etapa, resultado, status_http, creado, terminado = fila
+        trabajo = cls(usuario_id, archivo)
+        trabajo.id = trabajo_id
+        trabajo.estado = estado
+        trabajo.etapa = etapa
+        trabajo.filas_por_etapa = filas_por_etapa or {}
+        trabajo.resultado = resultado
+        trabajo.status_http = status_http
+        trabajo.creado = creado.timestamp()
+        trabajo.terminado = terminado.timestamp() if terminado else None
+        return trabajo
+
+    def como_dict(self):
+        return {
+            "id": self.id,
+            "archivo": self.nombre_archivo,
+            "estado": self.estado,
+            "etapa": self.etapa,
+            "filas_por_etapa": dict(self.filas_por_etapa),
+            "resultado": self.resultado,
+            "status_http": self.status_http,
+        }
+
+
+_trabajos = {}
+_trabajos_lock = threading.Lock()
+_pool = None
+
+
+def _obtener_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, "IMPORTACION_WORKERS", 2),
+            thread_name_prefix="importacion",
+        )
+    return _pool
+
+
+def _limpiar_terminados():
+    """Olvida los trabajos terminados hace más de TRABAJOS_RETENCION_SEGUNDOS"""
+    limite = time.time() - TRABAJOS_RETENCION_SEGUNDOS
+    for trabajo_id, trabajo in list(_trabajos.items()):
+        if trabajo.terminado and trabajo.terminado < limite:
+            del _trabajos[trabajo_id]
+
+
+def _purgar_trabajos(cursor):
+    """Borra de importacion_trabajos los trabajos terminados hace más de la retención"""
+    dias = getattr(settings, "IMPORTACION_TRABAJOS_RETENCION_DIAS", 7)
+    cursor.execute(
+        "DELETE FROM importacion_trabajos WHERE terminado < NOW() - make_interval(days => %s)",
+        [dias],
+    )
+
+
+def _guardar_trabajo(trabajo):
+    """Escribe el estado en importacion_trabajos; si la base falla el trabajo sigue en memoria"""
+    terminado = datetime.datetime.fromtimestamp(trabajo.terminado, datetime.timezone.utc) if trabajo.terminado else None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO importacion_trabajos
+                    (id, usuario_id, archivo, estado, etapa, filas_por_etapa, resultado, status_http, terminado)
+                VALUES (%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb, %s, %s)
+                ON CONFLICT (id) DO UPDATE SET
+                    estado = EXCLUDED.estado,
+                    etapa = EXCLUDED.etapa,
+                    filas_por_etapa = EXCLUDED.filas_por_etapa,
+                    resultado = EXCLUDED.resultado,
+                    status_http = EXCLUDED.status_http,
+                    terminado = EXCLUDED.terminado
+            """, [
+                trabajo.id, trabajo.usuario_id, trabajo.nombre_archivo, trabajo.estado, trabajo.etapa,
+                json.dumps(trabajo.filas_por_etapa), json.dumps(trabajo.resultado, cls=JSONEncoder),
+                trabajo.status_http, terminado,
+            ])
+            if trabajo.estado == "en_cola":
+                _purgar_trabajos(cursor)
+    except DatabaseError:
+        # Sin la fila, solo este proceso puede responder por el trabajo
+        logger.warning("No se pudo guardar el trabajo %s (%s)", trabajo.id, trabajo.estado, exc_info=True)
+
+
+def _leer_trabajo(trabajo_id, usuario_id):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT id, usuario_id, archivo, estado, etapa, filas_por_etapa, resultado, status_http, creado, terminado
+                FROM importacion_trabajos
+                WHERE id = %s AND usuario_id = %s
+            """, [trabajo_id, usuario_id])
+            fila = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return TrabajoImportacion.desde_fila(fila) if fila else None
+
+
+def _ejecutar(trabajo, contenido):
+    from .huellas import guardar_importacion
+    from .importacion import procesar_importacion
+
+    trabajo.estado = "procesando"
+    _guardar_trabajo(trabajo)
+    try:
+        respuesta, status_http = procesar_importacion(
+            io.BytesIO(contenido), trabajo.nombre_archivo, trabajo.usuario_id,
+            progreso=trabajo.avanzar, nombre_usuario=trabajo.nombre_usuario,
+        )
+        trabajo.resultado, trabajo.status_http = respuesta, status_http
+        trabajo.estado = "terminado" if status_http < 400 else "error"
+        if trabajo.huella:
+            guardar_importacion(trabajo.usuario_id, trabajo.huella, trabajo.nombre_archivo, respuesta, status_http)
+    except Exception as e:
+        trabajo.resultado = {"error": str(e)}
+        trabajo.status_http = status.HTTP_500_INTERNAL_SERVER_ERROR
+        trabajo.estado = "error"
+    finally:
+        trabajo.terminado = time.time()
+        _guardar_trabajo(trabajo)
+        # Cada hilo del pool abre su propia conexión; no dejarla colgada en el pooler
+        connections.close_all()
+
+
+def encolar_importacion(contenido, nombre_archivo, usuario_id, nombre_usuario=None, huella=None):
+    """
+    Registra un trabajo y lo manda al pool. Devuelve None si ya hay
+    IMPORTACION_MAX_PENDIENTES trabajos esperando o en curso.
+    """
+    with _trabajos_lock:
+        _limpiar_terminados()
+        pendientes = sum(1 for t in _trabajos.values() if t.terminado is None)
+        if pendientes >= getattr(settings, "IMPORTACION_MAX_PENDIENTES", 20):
+            return None
+
+        trabajo = TrabajoImportacion(usuario_id, nombre_archivo, nombre_usuario, huella)
+        _trabajos[trabajo.id] = trabajo
+
+    _guardar_trabajo(trabajo)
+    _obtener_pool().submit(_ejecutar, trabajo, contenido)
+    return trabajo
+
+
+def obtener_trabajo(trabajo_id, usuario_id):
+    """El trabajo, solo si pertenece a `usuario_id`; si corre en otro proceso, desde la base"""
+    trabajo = _trabajos.get(trabajo_id)
+    if trabajo is None:
+        return _leer_trabajo(trabajo_id, usuario_id)
+    if trabajo.usuario_id != usuario_id:
+        return None
+    return trabajo
@@ -0,0 +1,116 @@
+import json
+import re
+
+from django.conf import settings
+from rapidfuzz import fuzz, process
+
+from .usuarios import quitar_tildes
+
+
+# ================== RESOLUCIÓN DE UBICACIONES ==================
+# inventario_items.ubicacion_id guarda el id del edificio (así lo leen el listado, el filtro
+# por edificio y el resumen). El índice también conoce los nombres de los salones (del JSONB
+# salones.salon): un salón resuelve al edificio al que pertenece.
+CLAVES_NOMBRE_SALON = ("nombre", "salon", "numero", "codigo")
+
+
+def normalizar_ubicacion(texto):
+    """Sin tildes, en minúsculas, sin puntuación y con un solo espacio: 'Bloque  Adm.' -> 'bloque adm'"""
+    if not texto:
+        return ""
+    texto = quitar_tildes(str(texto)).lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", texto).split())
+
+
+def nombres_salon(salon):
+    """Nombres con los que puede aparecer un salón según su JSONB (texto, número, objeto o lista)"""
+    if salon is None:
+        return []
+    if isinstance(salon, str):
+        try:
+            salon = json.loads(salon)
+        except ValueError:
+            return [salon]
+    if isinstance(salon, (str, int, float)):
+        return [str(salon)]
+    if isinstance(salon, list):
+        return [nombre for elemento in salon for nombre in nombres_salon(elemento)]
+    if isinstance(salon, dict):
+        return [str(salon[clave]) for clave in CLAVES_NOMBRE_SALON if salon.get(clave) not in (None, "")]
+    return []
+
+
+class IndiceUbicaciones:
+    """
+    Nombre normalizado -> id de edificio, con los nombres de edificios, de salones y de
+    "edificio salón". Un nombre que corresponde a más de un edificio (p. ej. el salón "101")
+    no se resuelve solo. Lo que no aparece tal cual se busca por similitud.
+
+    resolver() recuerda cada valor distinto, así el costo depende de cuántas ubicaciones
+    distintas trae el archivo y no de cuántas filas. Se arma uno por importación.
+    """
+
+    def __init__(self, edificios, salones=(), umbral=None):
+        self.umbral = umbral if umbral is not None else getattr(settings, "UBICACIONES_UMBRAL_FUZZY", 88)
+        self.indice = {}
+        ambiguos = set()
+
+        def agregar(nombre, edificio_id):
+            clave = normalizar_ubicacion(nombre)
+            if not clave or clave in ambiguos:
+                return
+            if self.indice.get(clave, edificio_id) != edificio_id:
+                ambiguos.add(clave)
+                del self.indice[clave]
+                return
+            self.indice[clave] = edificio_id
+
+        nombres_edificio = {}
+        for edificio_id, nombre in edificios:
+            nombres_edificio[edificio_id] = nombre
+            agregar(nombre, edificio_id)
+        for _, salon, edificio_id in salones:
+            if edificio_id is None:
+                continue
+            for nombre in nombres_salon(salon):
+                agregar(nombre, edificio_id)
+                if edificio_id in nombres_edificio:
+                    agregar(f"{nombres_edificio[edificio_id]} {nombre}", edificio_id)
+
+        self.claves = list(self.indice)
+        self.memo = {}
+
+    def detalle(self, texto):
+        """{"id", "nivel", "score"}: nivel es exacto, fuzzy o None si no se encontró"""
+        if texto in self.memo:
+            return self.memo[texto]
+
+        clave = normalizar_ubicacion(texto)
+        if not clave:
+            resultado = {"id": None, "nivel": None, "score": None}
+        elif clave in self.indice:
+            resultado = {"id": self.indice[clave], "nivel": "exacto", "score": None}
+        else:
+            match = process.extractOne(
+                clave, self.claves, scorer=fuzz.token_sort_ratio, score_cutoff=self.umbral
+            ) if self.claves else None
+            if match:
+                resultado = {"id": self.indice[match[0]], "nivel": "fuzzy", "score": round(match[1], 1)}
+            else:
+                resultado = {"id": None, "nivel": None, "score": None}
+
+        self.memo[texto] = resultado
+        return resultado
+
+    def resolver(self, texto):
+        """Id del edificio de `texto` o None"""
+        return self.detalle(texto)["id"]
+
+
+def cargar_ubicaciones(cursor):
+    """IndiceUbicaciones con los edificios y salones de la base"""
+    cursor.execute("SELECT id, edificio FROM edificios")
+    edificios = cursor.fetchall()
+    cursor.execute("SELECT id, salon, id_edificio FROM salones")
+    salones = cursor.fetchall()
+    return IndiceUbicaciones(edificios, salones)
@@ -1,7 +1,16 @@
 from django.urls import path
-from .views import importar_inventario, obtener_inventario_usuario
+from .views import (
+    buscar_inventario, estado_importacion, exportar_inventario, importar_inventario, importar_inventarios, listo,
+    obtener_inventario_usuario, resumen_inventario,
+)
 
 urlpatterns = [
+    path("listo/", listo, name="listo"),
     path("importar-inventario/", importar_inventario, name="importar_inventario"),
+    path("importar-inventarios/", importar_inventarios, name="importar_inventarios"),
+    path("importaciones/<str:trabajo_id>/", estado_importacion, name="estado_importacion"),
     path("inventario-usuario/", obtener_inventario_usuario, name="obtener_inventario_usuario"),
+    path("exportar-inventario/", exportar_inventario, name="exportar_inventario"),
+    path("buscar-inventario/", buscar_inventario, name="buscar_inventario"),
+    path("resumen-inventario/", resumen_inventario, name="resumen_inventario"),
 ]
\ No newline at end of file
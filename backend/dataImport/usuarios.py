@@ -0,0 +1,563 @@
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+logger = logging.getLogger(__name__)
+# Detalle por nombre buscado: apagado salvo que se pida (settings.IMPORTACION_LOG_FILAS)
+logger_filas = logging.getLogger(f"{__name__}.filas")
+
+# ================== FUNCIONES DE NOMBRES ==================
+
+def quitar_tildes(texto):
+    """Descompone (NFD) y descarta lo que no es ASCII: 'Peña Gómez' -> 'Pena Gomez'"""
+    texto = unicodedata.normalize("NFD", texto)
+    return texto.encode("ascii", "ignore").decode("utf-8")
+
+def normalizar_texto(texto):
+    if not texto:
+        return ""
+    texto = quitar_tildes(texto)
+    texto = re.sub(r"[^A-Za-z\s]", "", texto).upper().strip()
+    return texto
+
+def dividir_nombre(nombre_completo):
+    partes = normalizar_texto(nombre_completo).split()
+    num = len(partes)
+
+    if num == 0:
+        return {"nombre1": "", "nombre2": "", "apellido1": "", "apellido2": ""}
+
+    elif num == 1:
+        return {"nombre1": partes[0], "nombre2": "", "apellido1": "", "apellido2": ""}
+
+    elif num == 2:
+        return {
+            "nombre1": partes[0],
+            "nombre2": "",
+            "apellido1": partes[1],
+            "apellido2": "",
+        }
+
+    elif num == 3:
+        return {
+            "nombre1": partes[0],
+            "nombre2": "",
+            "apellido1": partes[1],
+            "apellido2": partes[2],
+        }
+
+    else:  # 4 o más
+        return {
+            "nombre1": partes[0],
+            "nombre2": partes[1],
+            "apellido1": partes[2],
+            "apellido2": partes[3],
+        }
+
+UMBRALES_POR_PARTE = {"nombre1": 85, "nombre2": 75, "apellido1": 85, "apellido2": 75}
+
+
+def comparar_nombres_completos(
+    n1,
+    n2,
+    umbral_global=85,
+    umbrales_por_parte=UMBRALES_POR_PARTE,
+    doble_error_limite=2,
+):
+    return comparar_partes(
+        dividir_nombre(n1),
+        dividir_nombre(n2),
+        umbral_global=umbral_global,
+        umbrales_por_parte=umbrales_por_parte,
+        doble_error_limite=doble_error_limite,
+    )
+
+def comparar_partes(
+    p1,
+    p2,
+    umbral_global=85,
+    umbrales_por_parte=UMBRALES_POR_PARTE,
+    doble_error_limite=2,
+):
+    """Igual que comparar_nombres_completos pero con los nombres ya divididos"""
+    scores = {
+        "nombre1": fuzz.ratio(p1["nombre1"], p2["nombre1"]),
+        "nombre2": fuzz.ratio(p1["nombre2"], p2["nombre2"]),
+        "apellido1": fuzz.ratio(p1["apellido1"], p2["apellido1"]),
+        "apellido2": fuzz.ratio(p1["apellido2"], p2["apellido2"]),
+    }
+
+    similitud_promedio = (
+        0.25 * scores["nombre1"]
+        + 0.15 * scores["nombre2"]
+        + 0.3 * scores["apellido1"]
+        + 0.3 * scores["apellido2"]
+    )
+
+    campos_en_riesgo = 0
+    for parte, umbral in umbrales_por_parte.items():
+        score = scores[parte]
+        if score < umbral:
+            return False, similitud_promedio, scores
+        elif umbral <= score < 90:
+            campos_en_riesgo += 1
+
+    if campos_en_riesgo >= doble_error_limite:
+        return False, similitud_promedio, scores
+
+    return similitud_promedio >= umbral_global, similitud_promedio, scores
+
+
+def comparar_partes_lote(
+    partes_a,
+    partes_b,
+    umbral_global=85,
+    umbrales_por_parte=UMBRALES_POR_PARTE,
+    doble_error_limite=2,
+):
+    """
+    comparar_partes para todos los pares de dos listas de nombres divididos.
+
+    Devuelve (validos, similitud) como matrices len(partes_a) x len(partes_b). Usa
+    process.cdist en todos los núcleos con las mismas ponderaciones y umbrales.
+    """
+    scores = {
+        parte: process.cdist(
+            [p[parte] for p in partes_a],
+            [p[parte] for p in partes_b],
+            scorer=fuzz.ratio,
+            dtype=np.float64,
+            workers=-1,
+        )
+        for parte in ("nombre1", "nombre2", "apellido1", "apellido2")
+    }
+
+    similitud = (
+        0.25 * scores["nombre1"]
+        + 0.15 * scores["nombre2"]
+        + 0.3 * scores["apellido1"]
+        + 0.3 * scores["apellido2"]
+    )
+
+    validos = np.ones(similitud.shape, dtype=bool)
+    campos_en_riesgo = np.zeros(similitud.shape, dtype=np.int8)
+    for parte, umbral in umbrales_por_parte.items():
+        score = scores[parte]
+        validos &= score >= umbral
+        campos_en_riesgo += (score >= umbral) & (score < 90)
+
+    validos &= campos_en_riesgo < doble_error_limite
+    validos &= similitud >= umbral_global
+    return validos, similitud
+
+
+# ================== INDICE DE BLOQUEO (FUZZY) ==================
+def _bigramas(parte):
+    """Multiconjunto de bigramas de una parte del nombre, con centinelas ^ y $"""
+    texto = f"^{parte}$"
+    return Counter(texto[i:i + 2] for i in range(len(texto) - 1))
+
+def _distancia_maxima(len1, len2, umbral):
+    """Mayor distancia Indel con la que fuzz.ratio todavía puede llegar a `umbral`"""
+    return math.ceil((100 - umbral) * (len1 + len2) / 100)
+
+
+class IndiceBloqueo:
+    """
+    Índice de bigramas sobre apellido1/nombre1 para descartar usuarios sin calcular fuzz.
+
+    comparar_partes rechaza cualquier par cuyo apellido1 o nombre1 quede bajo su umbral,
+    así que solo hace falta puntuar a los usuarios que podrían superarlo. El filtro es el
+    lema de q-gramas: dos cadenas a distancia Indel d comparten al menos
+    max(len1, len2) + 1 - 2*d bigramas (con centinelas). Nunca descarta un usuario que la
+    búsqueda completa hubiera aceptado.
+    """
+
+    CAMPOS = ("apellido1", "nombre1")
+
+    def __init__(self, partes_usuarios, umbrales_por_parte=UMBRALES_POR_PARTE):
+        self.umbrales = {campo: umbrales_por_parte[campo] for campo in self.CAMPOS}
+        self.longitudes = {campo: [] for campo in self.CAMPOS}
+        self.bigramas = {campo: defaultdict(list) for campo in self.CAMPOS}  # bigrama -> [(idx, veces)]
+
+        for idx, partes in enumerate(partes_usuarios):
+            self.agregar(idx, partes)
+
+    def agregar(self, idx, partes):
+        for campo in self.CAMPOS:
+            self.longitudes[campo].append(len(partes[campo]))
+            for bigrama, veces in _bigramas(partes[campo]).items():
+                self.bigramas[campo][bigrama].append((idx, veces))
+
+    def _filtrar(self, campo, parte, permitidos=None):
+        umbral = self.umbrales[campo]
+        longitudes = self.longitudes[campo]
+        largo = len(parte)
+
+        compartidos = defaultdict(int)
+        for bigrama, veces in _bigramas(parte).items():
+            for idx, veces_usuario in self.bigramas[campo].get(bigrama, ()):
+                if permitidos is None or idx in permitidos:
+                    compartidos[idx] += min(veces, veces_usuario)
+
+        candidatos = set()
+        for idx, comunes in compartidos.items():
+            otro = longitudes[idx]
+            distancia = _distancia_maxima(largo, otro, umbral)
+            if abs(largo - otro) <= distancia and comunes >= max(largo, otro) + 1 - 2 * distancia:
+                candidatos.add(idx)
+        return candidatos
+
+    def candidatos(self, partes):
+        """Índices (en orden de inserción) de los usuarios que pueden pasar comparar_partes"""
+        permitidos = None
+        for campo in self.CAMPOS:
+            permitidos = self._filtrar(campo, partes[campo], permitidos)
+            if not permitidos:
+                return []
+        return sorted(permitidos)
+
+
+# ================== CACHE INTELIGENTE DE USUARIOS ==================
+class UsuarioCache:
+    MEMO_MAXIMO = 5000  # nombres crudos recordados por resolver_nombres (LRU)
+
+    def __init__(self, cursor):
+        self.cache_directo = {}  # nombre -> id
+        self.cache_invertido = {}  # nombre_invertido -> id
+        self.cache_palabras = {}  # palabra -> lista de (id, nombre_completo)
+        self.todos_usuarios = []  # lista de (id, nombre) para fuzzy
+        self.partes_usuarios = []  # dividir_nombre() de cada entrada de todos_usuarios
+        self.indice_fuzzy = IndiceBloqueo([])
+        self.ids = set()
+        self.max_id = 0
+        self.memo = OrderedDict()  # nombre crudo -> id ya resuelto
+        self._lock = threading.RLock()
+        self._construir_cache(cursor)
+    
+    @property
+    def version(self):
+        """(max id, cantidad de usuarios) que la prueba de versión compara contra la tabla"""
+        return self.max_id, len(self.ids)
+    
+    def _construir_cache(self, cursor):
+        """Construye todos los caches de una vez"""
+        inicio = time.perf_counter()
+        
+        # Obtener todos los usuarios de una vez
+        cursor.execute("SELECT id, nombre FROM usuarios")
+        todos = cursor.fetchall()
+        
+        for user_id, nombre in todos:
+            self.agregar_usuario(user_id, nombre)
+        
+        logger.info(
+            "Cache de usuarios construido: %s usuarios en %.3f s",
+            len(self.todos_usuarios), time.perf_counter() - inicio,
+        )
+    
+    def agregar_usuario(self, user_id, nombre):
+        """Incorpora un usuario a todos los caches; ignora IDs que ya están"""
+        with self._lock:
+            if user_id in self.ids:
+                return
+            self.ids.add(user_id)
+            self.max_id = max(self.max_id, user_id)
+            
+            nombre_norm = nombre.strip()
+            self.todos_usuarios.append((user_id, nombre_norm))
+            self.partes_usuarios.append(dividir_nombre(nombre_norm))
+            self.indice_fuzzy.agregar(len(self.partes_usuarios) - 1, self.partes_usuarios[-1])
+            
+            # Cache directo
+            self.cache_directo[nombre_norm.lower()] = user_id
+            
+            # Cache invertido
+            invertido = " ".join(nombre_norm.split()[::-1])
+            self.cache_invertido[invertido.lower()] = user_id
+            
+            # Cache por palabras
+            palabras = nombre_norm.split()
+            for palabra in palabras:
+                if len(palabra) > 2:
+                    palabra_key = palabra.lower()
+                    if palabra_key not in self.cache_palabras:
+                        self.cache_palabras[palabra_key] = []
+                    self.cache_palabras[palabra_key].append((user_id, nombre_norm))
+            
+            # Un usuario nuevo puede cambiar el resultado de cualquier nombre ya resuelto
+            self.memo.clear()
+    
+    def actualizar(self, cursor, version):
+        """
+        Trae los usuarios con id mayor al último conocido. Devuelve False si con eso no se
+        alcanza `version` (hubo borrados o cambios), en cuyo caso hay que reconstruir.
+        """
+        max_id, total = version
+        if max_id < self.max_id or total < len(self.ids):
+            return False
+        
+        cursor.execute("SELECT id, nombre FROM usuarios WHERE id > %s", [self.max_id])
+        for user_id, nombre in cursor.fetchall():
+            self.agregar_usuario(user_id, nombre)
+        return self.version == (max_id, total)
+    
+    def buscar_usuario(self, nombre, metricas=None):
+        """Búsqueda optimizada usando caches en memoria; `metricas` cuenta el nivel que acertó"""
+        contar = metricas.contar if metricas is not None else (lambda nivel: None)
+        if not nombre or str(nombre).lower() == "nan":
+            contar("vacio")
+            return None
+        
+        nombre_norm = nombre.strip()
+        
+        # 1-3. Búsqueda directa, invertida y por palabras
+        user_id, nivel = self._buscar_exacto_nivel(nombre_norm)
+        if user_id:
+            contar(nivel)
+            return user_id
+        
+        # 4. Fuzzy matching (último recurso)
+        mejor_match, mejor_score = self.buscar_fuzzy(nombre_norm)
+        
+        if mejor_match:
+            contar("fuzzy")
+            if logger_filas.isEnabledFor(logging.DEBUG):
+                logger_filas.debug("'%s' -> %s (fuzzy, score %.1f)", nombre_norm, mejor_match, mejor_score)
+            return mejor_match
+        
+        contar("no_encontrado")
+        if logger_filas.isEnabledFor(logging.DEBUG):
+            logger_filas.debug("'%s' -> no encontrado", nombre_norm)
+        return 0
+
+    def _buscar_exacto(self, nombre_norm):
+        """Niveles directo, invertido y por palabras; None si ninguno encuentra al usuario"""
+        return self._buscar_exacto_nivel(nombre_norm)[0]
+
+    def _buscar_exacto_nivel(self, nombre_norm):
+        """(id, nivel) del primer nivel exacto que encuentra al usuario; (None, None) si ninguno"""
+        # 1. Búsqueda directa
+        user_id = self.cache_directo.get(nombre_norm.lower())
+        if user_id:
+            return user_id, "directo"
+        
+        # 2. Búsqueda invertida
+        invertido = " ".join(nombre_norm.split()[::-1])
+        user_id = self.cache_invertido.get(invertido.lower())
+        if user_id:
+            return user_id, "invertido"
+        
+        # 3. Búsqueda por palabras (LIKE)
+        palabras = nombre_norm.split()
+        candidatos = set()
+        
+        for palabra in palabras:
+            if len(palabra) > 2:
+                palabra_key = palabra.lower()
+                if palabra_key in self.cache_palabras:
+                    for user_id, nombre_db in self.cache_palabras[palabra_key]:
+                        # Verificar que todas las palabras estén en el nombre de la DB
+                        nombre_db_lower = nombre_db.lower()
+                        if all(p.lower() in nombre_db_lower for p in palabras):
+                            candidatos.add((user_id, nombre_db))
+        
+        if candidatos:
+            # Tomar el primer candidato (más simple que fuzzy para LIKE)
+            user_id, nombre_db = list(candidatos)[0]
+            return user_id, "palabras"
+        
+        return None, None
+
+    def resolver_nombres(self, nombres, metricas=None):
+        """
+        Resuelve de una vez todos los nombres distintos de una importación.
+
+        Devuelve {nombre: id} con la misma semántica que buscar_usuario (None para vacíos,
+        0 si no se encontró). Los que no salen por los niveles exactos se puntúan juntos
+        con buscar_fuzzy_lote. Si se pasa `metricas` (MetricasImportacion) se cuenta el
+        nivel de cada nombre y se mide aparte el tiempo de fuzzy.
+        """
+        contar = metricas.contar if metricas is not None else (lambda nivel: None)
+        detalle_filas = logger_filas.isEnabledFor(logging.DEBUG)
+        resueltos = {}
+        pendientes = []
+
+        for nombre in set(nombres):
+            if not nombre or str(nombre).lower() == "nan":
+                resueltos[nombre] = None
+                contar("vacio")
+                continue
+            with self._lock:
+                if nombre in self.memo:
+                    self.memo.move_to_end(nombre)
+                    resueltos[nombre] = self.memo[nombre]
+                    contar("memo")
+                    continue
+            user_id, nivel = self._buscar_exacto_nivel(nombre.strip())
+            if user_id:
+                resueltos[nombre] = user_id
+                contar(nivel)
+                if detalle_filas:
+                    logger_filas.debug("'%s' -> %s (%s)", nombre, user_id, nivel)
+            else:
+                pendientes.append(nombre)
+
+        if pendientes:
+            inicio = time.perf_counter()
+            matches = self.buscar_fuzzy_lote([nombre.strip() for nombre in pendientes])
+            if metricas is not None:
+                metricas.segundos["usuarios_fuzzy"] += time.perf_counter() - inicio
+            for nombre, (user_id, score) in zip(pendientes, matches):
+                resueltos[nombre] = user_id or 0
+                nivel = "fuzzy" if user_id else "no_encontrado"
+                contar(nivel)
+                if detalle_filas:
+                    logger_filas.debug("'%s' -> %s (%s, score %.1f)", nombre, user_id or 0, nivel, score)
+
+        with self._lock:
+            for nombre, user_id in resueltos.items():
+                if user_id is not None:
+                    self.memo[nombre] = user_id
+                    self.memo.move_to_end(nombre)
+            while len(self.memo) > self.MEMO_MAXIMO:
+                self.memo.popitem(last=False)
+
+        return resueltos
+
+    def explicar_nombres(self, nombres):
+        """
+        Como resolver_nombres pero con el detalle de cada nombre: {nombre: {"id", "nivel",
+        "score"}}. nivel es directo, invertido, palabras, fuzzy o None (vacío o no encontrado);
+        score solo viene en fuzzy. No usa ni modifica el memo.
+        """
+        detalle = {}
+        pendientes = []
+        for nombre in set(nombres):
+            if not nombre or str(nombre).lower() == "nan":
+                detalle[nombre] = {"id": None, "nivel": None, "score": None}
+                continue
+            user_id, nivel = self._buscar_exacto_nivel(nombre.strip())
+            if user_id:
+                detalle[nombre] = {"id": user_id, "nivel": nivel, "score": None}
+            else:
+                pendientes.append(nombre)
+
+        if pendientes:
+            matches = self.buscar_fuzzy_lote([nombre.strip() for nombre in pendientes])
+            for nombre, (user_id, score) in zip(pendientes, matches):
+                if user_id:
+                    detalle[nombre] = {"id": user_id, "nivel": "fuzzy", "score": round(score, 1)}
+                else:
+                    detalle[nombre] = {"id": 0, "nivel": None, "score": None}
+        return detalle
+
+    def _instantanea(self, lista_partes):
+        """
+        (todos_usuarios, partes_usuarios, candidatos) tomados bajo el lock: copia de las dos
+        listas y los índices candidatos de cada elemento de `lista_partes`. agregar_usuario
+        puede sumar usuarios desde otro hilo mientras se puntúa y todo tiene que coincidir.
+        """
+        with self._lock:
+            candidatos = [self.indice_fuzzy.candidatos(partes) for partes in lista_partes]
+            return list(self.todos_usuarios), list(self.partes_usuarios), candidatos
+
+    def buscar_fuzzy(self, nombre):
+        """Mejor (id, score) por comparar_partes, puntuando solo los candidatos del índice"""
+        partes = dividir_nombre(nombre)
+        mejor_match = None
+        mejor_score = 0
+
+        # El índice y las listas se leen juntos para que cada idx apunte a su usuario
+        with self._lock:
+            candidatos = [
+                (self.todos_usuarios[idx][0], self.partes_usuarios[idx])
+                for idx in self.indice_fuzzy.candidatos(partes)
+            ]
+
+        for user_id, partes_usuario in candidatos:
+            valido, score, _ = comparar_partes(partes, partes_usuario)
+            if valido and score > mejor_score:
+                mejor_match = user_id
+                mejor_score = score
+
+        return mejor_match, mejor_score
+
+    def buscar_fuzzy_lote(self, nombres, bloque=256):
+        """
+        buscar_fuzzy para muchos nombres a la vez, puntuando con matrices de rapidfuzz.
+
+        Cada bloque de nombres se compara solo contra la unión de sus candidatos en el índice
+        de bloqueo, no contra todos los usuarios; un bloque sin candidatos no se puntúa.
+        """
+        partes = [dividir_nombre(nombre) for nombre in nombres]
+        todos_usuarios, partes_usuarios, candidatos = self._instantanea(partes)
+
+        resultados = []
+        for inicio in range(0, len(nombres), bloque):
+            partes_bloque = partes[inicio:inicio + bloque]
+            # En orden de inserción, así el desempate es el mismo que en buscar_fuzzy
+            columnas = sorted(set().union(*candidatos[inicio:inicio + bloque]))
+            if not columnas:
+                resultados.extend((None, 0) for _ in partes_bloque)
+                continue
+            validos, similitud = comparar_partes_lote(partes_bloque, [partes_usuarios[c] for c in columnas])
+
+            # El primer máximo gana, igual que el recorrido con `score > mejor_score`
+            similitud = np.where(validos, similitud, -1.0)
+            mejores = similitud.argmax(axis=1)
+            for fila, columna in enumerate(mejores):
+                score = similitud[fila, columna]
+                if score < 0:
+                    resultados.append((None, 0))
+                else:
+                    resultados.append((todos_usuarios[columnas[columna]][0], float(score)))
+
+        return resultados
+
+
+# ================== CACHE COMPARTIDO ENTRE PETICIONES ==================
+_usuario_cache = None
+_usuario_cache_lock = threading.Lock()
+
+
+def obtener_usuario_cache(cursor):
+    """
+    Devuelve el UsuarioCache del proceso, validado contra la tabla con una consulta barata.
+
+    Si desde la última vez solo se insertaron usuarios se traen únicamente los nuevos; ante
+    cualquier otra diferencia se reconstruye completo.
+    """
+    global _usuario_cache
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM usuarios")
+    version = tuple(cursor.fetchone())
+
+    with _usuario_cache_lock:
+        cache = _usuario_cache
+        if cache is not None and (cache.version == version or cache.actualizar(cursor, version)):
+            return cache
+
+        _usuario_cache = UsuarioCache(cursor)
+        return _usuario_cache
+
+
+def registrar_usuario_en_cache(user_id, nombre):
+    """Avisa al cache compartido de un usuario recién insertado (p. ej. desde register_view)"""
+    cache = _usuario_cache
+    if cache is not None:
+        cache.agregar_usuario(user_id, nombre)
+
+
+def invalidar_usuario_cache():
+    """Descarta el cache compartido; el próximo obtener_usuario_cache lo reconstruye"""
+    global _usuario_cache
+    with _usuario_cache_lock:
+        _usuario_cache = None
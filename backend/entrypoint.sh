@@ -4,9 +4,18 @@ echo "Esperando a que la base de datos esté lista..."
 # Espera hasta que la DB esté disponible (opcional)
 sleep 5
 
+# DJANGO_MODO=desarrollo usa el servidor de desarrollo (recarga automática)
+if [ "$DJANGO_MODO" = "desarrollo" ]; then
+    echo "Ejecutando migraciones..."
+    python manage.py makemigrations
+    python manage.py migrate
+
+    echo "Iniciando el servidor Django..."
+    exec python manage.py runserver 0.0.0.0:8000
+fi
+
 echo "Ejecutando migraciones..."
-python manage.py makemigrations
 python manage.py migrate
 
-echo "Iniciando el servidor Django..."
-python manage.py runserver 0.0.0.0:8000
+echo "Iniciando gunicorn..."
+exec gunicorn -c gunicorn.conf.py backend.wsgi:application
@@ -0,0 +1,38 @@
+# Configuración de gunicorn (modo producción, ver entrypoint.sh)
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Procesos y hilos por proceso; las importaciones usan CPU (pandas, rapidfuzz), el resto espera a la base
+workers = int(os.environ.get("GUNICORN_WORKERS", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+
+# Las importaciones síncronas de archivos grandes pueden tardar
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 180))
+graceful_timeout = 30
+keepalive = 5
+
+# Recicla workers de a poco para acotar la memoria que dejan pandas y los caches
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+
+# La aplicación se carga una vez en el maestro y los workers la heredan ya calentada
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    from dataImport.arranque import calentar, cerrar_conexiones
+
+    try:
+        calentar()
+        server.log.info("Aplicación calentada (módulos y cache de usuarios)")
+    except Exception as e:
+        # Sin base no se arma el cache; cada worker lo construirá en su primera importación
+        server.log.warning("No se pudo calentar la aplicación: %s", e)
+    finally:
+        cerrar_conexiones()
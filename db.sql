@@ -101,10 +101,100 @@ CREATE TABLE IF NOT EXISTS public.django_session (
   expire_date TIMESTAMPTZ NOT NULL
 );
 
+-- Importaciones asíncronas (dataImport.tareas): estado visible desde cualquier worker
+CREATE TABLE IF NOT EXISTS public.importacion_trabajos (
+  id              VARCHAR(32) PRIMARY KEY,
+  usuario_id      INTEGER REFERENCES public.usuarios(id) ON UPDATE CASCADE ON DELETE CASCADE,
+  archivo         TEXT,
+  estado          TEXT NOT NULL,   -- en_cola, procesando, terminado, error
+  etapa           TEXT,
+  filas_por_etapa JSONB,
+  resultado       JSONB,
+  status_http     INTEGER,
+  creado          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  terminado       TIMESTAMPTZ
+);
+
+-- Archivos importados con éxito (dataImport.huellas): subir el mismo archivo otra vez
+-- devuelve este resultado sin procesarlo, salvo force=1
+CREATE TABLE IF NOT EXISTS public.importacion_archivos (
+  usuario_id   INTEGER NOT NULL REFERENCES public.usuarios(id) ON UPDATE CASCADE ON DELETE CASCADE,
+  huella       CHAR(64) NOT NULL,   -- sha256 del contenido
+  categoria_id INTEGER NOT NULL,    -- validateCategory(nombre del archivo)
+  archivo      TEXT,
+  resultado    JSONB,
+  status_http  INTEGER,
+  importado    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (usuario_id, huella, categoria_id)
+);
+
+-- Versión del inventario de cada usuario (recibido_por_id), para el ETag del listado
+-- (dataImport.consultas.version_inventario). carga.upsert_items la incrementa en la misma
+-- transacción en que escribe, así nunca retrocede aunque una importación larga confirme tarde.
+CREATE TABLE IF NOT EXISTS public.inventario_versiones (
+  usuario_id INTEGER PRIMARY KEY REFERENCES public.usuarios(id) ON UPDATE CASCADE ON DELETE CASCADE,
+  version    BIGINT NOT NULL DEFAULT 0
+);
+
+-- =========================================================
+-- BÚSQUEDA (dataImport.consultas.construir_consulta_busqueda)
+-- =========================================================
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Sin tildes y en minúsculas, como normalizar_busqueda en Python. unaccent() no es
+-- IMMUTABLE; con el diccionario explícito se puede usar en columnas generadas e índices.
+CREATE OR REPLACE FUNCTION public.normalizar_busqueda(texto TEXT) RETURNS TEXT
+  LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+  AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, texto)) $$;
+
+ALTER TABLE public.inventario_items
+  ADD COLUMN IF NOT EXISTS busqueda TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('spanish', public.normalizar_busqueda(coalesce(inventario, ''))), 'A') ||
+    setweight(to_tsvector('spanish', public.normalizar_busqueda(coalesce(descripcion, ''))), 'B') ||
+    setweight(to_tsvector('spanish', public.normalizar_busqueda(coalesce(marca, ''))), 'C')
+  ) STORED;
+
+ALTER TABLE public.inventario_items
+  ADD COLUMN IF NOT EXISTS busqueda_texto TEXT GENERATED ALWAYS AS (
+    public.normalizar_busqueda(
+      coalesce(inventario, '') || ' ' || coalesce(descripcion, '') || ' ' || coalesce(marca, '')
+    )
+  ) STORED;
+
+-- Selector de usuarios (accounts.consultas.construir_consulta_usuarios): el espacio inicial
+-- deja buscar el comienzo de cualquier palabra con LIKE '% texto%'
+ALTER TABLE public.usuarios
+  ADD COLUMN IF NOT EXISTS nombre_busqueda TEXT GENERATED ALWAYS AS (
+    ' ' || public.normalizar_busqueda(nombre)
+  ) STORED;
+
+-- Resumen por escuela, categoría, ubicación y mes de fecha_recibido.
+-- Lo mantiene la importación (dataImport.resumen) aplicando el delta de cada fila escrita.
+CREATE TABLE IF NOT EXISTS public.inventario_resumen (
+  escuela_id   INTEGER,
+  categoria_id INTEGER,
+  ubicacion_id INTEGER,
+  mes          DATE,
+  items        BIGINT  NOT NULL DEFAULT 0,
+  valor        NUMERIC NOT NULL DEFAULT 0,
+  CONSTRAINT inventario_resumen_clave
+    UNIQUE NULLS NOT DISTINCT (escuela_id, categoria_id, ubicacion_id, mes)
+);
+
+-- Carga inicial (solo si el resumen está vacío)
+INSERT INTO public.inventario_resumen (escuela_id, categoria_id, ubicacion_id, mes, items, valor)
+SELECT escuela_id, categoria_id, ubicacion_id, date_trunc('month', fecha_recibido)::date,
+       COUNT(*), COALESCE(SUM(valor), 0)
+FROM public.inventario_items
+WHERE NOT EXISTS (SELECT 1 FROM public.inventario_resumen)
+GROUP BY 1, 2, 3, 4;
+
 -- =========================================================
 -- ÍNDICES ÚTILES
 -- =========================================================
-CREATE INDEX IF NOT EXISTS idx_inventario_items_inventario
+-- ON CONFLICT (inventario) de la importación necesita que el número sea único
+CREATE UNIQUE INDEX IF NOT EXISTS idx_inventario_items_inventario_unico
   ON public.inventario_items (inventario);
 
 CREATE INDEX IF NOT EXISTS idx_inventario_items_categoria
@@ -113,9 +203,30 @@ CREATE INDEX IF NOT EXISTS idx_inventario_items_categoria
 CREATE INDEX IF NOT EXISTS idx_inventario_items_ubicacion
   ON public.inventario_items (ubicacion_id);
 
+CREATE INDEX IF NOT EXISTS idx_inventario_items_busqueda
+  ON public.inventario_items USING GIN (busqueda);
+
+CREATE INDEX IF NOT EXISTS idx_inventario_items_busqueda_trgm
+  ON public.inventario_items USING GIN (busqueda_texto gin_trgm_ops);
+
+-- Listado paginado por usuario: ORDER BY fecha_recibido DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_inventario_items_recibido_fecha
+  ON public.inventario_items (recibido_por_id, fecha_recibido DESC, id DESC);
+
 CREATE INDEX IF NOT EXISTS idx_inventario_trazabilidad_inventario_fecha
   ON public.inventario_trazabilidad (inventario, fecha);
 
+-- Login y registro buscan por código
+CREATE INDEX IF NOT EXISTS idx_usuarios_codigo
+  ON public.usuarios (codigo);
+
+-- Listado de usuarios paginado por (nombre, id) y búsqueda por nombre
+CREATE INDEX IF NOT EXISTS idx_usuarios_nombre
+  ON public.usuarios (nombre, id);
+
+CREATE INDEX IF NOT EXISTS idx_usuarios_nombre_busqueda
+  ON public.usuarios USING GIN (nombre_busqueda gin_trgm_ops);
+
 CREATE INDEX IF NOT EXISTS idx_usuarios_escuela
   ON public.usuarios (escuela_id);
 